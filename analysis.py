@@ -0,0 +1,377 @@
+"""
+Static analysis of uploaded Python files
+
+Plain functions with no web or database dependencies, shared by the /analyze
+request path (demo.py) and bulk ingestion worker processes (bulk_ingest.py).
+"""
+import ast
+import datetime
+import json
+import os
+import re
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from fingerprint import fingerprint_function, lsh_band_keys
+from profiling import stage as profile_stage
+
+# Blocks that add a level of nesting and nodes that add a decision point
+NESTING_NODES = (ast.If, ast.For, ast.AsyncFor, ast.While, ast.With, ast.AsyncWith, ast.Try)
+DECISION_NODES = (ast.If, ast.IfExp, ast.For, ast.AsyncFor, ast.While, ast.ExceptHandler, ast.Assert, ast.comprehension)
+if hasattr(ast, "Match"):
+    NESTING_NODES += (ast.Match,)
+    DECISION_NODES += (ast.match_case,)
+if hasattr(ast, "TryStar"):
+    NESTING_NODES += (ast.TryStar,)
+HOTSPOT_COUNT = 10
+HOTSPOT_FIELDS = ("qualname", "line_start", "cyclomatic", "max_nesting", "loc", "loops", "recursive")
+
+class FunctionMetricsVisitor:
+    """
+    Single traversal of a module collecting per-function metrics
+    (cyclomatic complexity, max nesting, LOC, loops, recursion) together
+    with the file-level counts used by analyze_file
+    Fingerprinting is separate: fingerprint_function copies and walks each
+    function's own subtree, so nested functions are walked once per
+    enclosing function as well.
+    """
+
+    def __init__(self, source_lines: List[str]):
+        self.source_lines = source_lines
+        self.functions: List[Dict] = []
+        self.counts = {"classes": 0, "FOR": 0, "imports": 0, "variables": 0}
+        self.max_loop_depth = 0
+        self._scope: List[str] = []
+        self._frames: List[Dict] = []
+
+    def visit(self, node: ast.AST, nesting: int = 0, loop_depth: int = 0):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            self._visit_function(node, nesting, loop_depth)
+            return
+        if isinstance(node, ast.ClassDef):
+            self.counts["classes"] += 1
+            self._scope.append(node.name)
+            for child in ast.iter_child_nodes(node):
+                self.visit(child, nesting, loop_depth)
+            self._scope.pop()
+            return
+
+        if isinstance(node, ast.For):
+            self.counts["FOR"] += 1
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            self.counts["imports"] += 1
+        elif isinstance(node, ast.Assign):
+            self.counts["variables"] += 1
+
+        # File-level loop depth drives the time complexity estimate
+        if isinstance(node, (ast.For, ast.While)):
+            loop_depth += 1
+            self.max_loop_depth = max(self.max_loop_depth, loop_depth)
+
+        frame = self._frames[-1] if self._frames else None
+        if frame is not None:
+            if isinstance(node, DECISION_NODES):
+                frame["cyclomatic"] += 1
+            if isinstance(node, ast.comprehension):
+                frame["cyclomatic"] += len(node.ifs)
+            elif isinstance(node, ast.BoolOp):
+                frame["cyclomatic"] += len(node.values) - 1
+            if isinstance(node, (ast.For, ast.AsyncFor, ast.While)):
+                frame["loops"] += 1
+            if isinstance(node, ast.Call) and self._is_self_call(node.func, frame["name"]):
+                frame["recursive"] = True
+            if isinstance(node, NESTING_NODES):
+                nesting += 1
+                frame["max_nesting"] = max(frame["max_nesting"], nesting)
+
+        for child in ast.iter_child_nodes(node):
+            # elif is an If inside orelse; keep it at the level of its if
+            is_elif = (isinstance(node, ast.If) and isinstance(child, ast.If)
+                       and len(node.orelse) == 1 and node.orelse[0] is child)
+            self.visit(child, nesting - 1 if is_elif else nesting, loop_depth)
+
+    def _visit_function(self, node, nesting: int, loop_depth: int):
+        # Decorators, defaults and annotations run in the enclosing scope
+        args = node.args
+        params = args.posonlyargs + args.args + args.kwonlyargs + [a for a in (args.vararg, args.kwarg) if a]
+        annotations = [a.annotation for a in params] + [node.returns]
+        for child in node.decorator_list + args.defaults + args.kw_defaults + annotations:
+            if child is not None:
+                self.visit(child, nesting, loop_depth)
+
+        start_line = node.lineno - 1
+        end_line = node.end_lineno if hasattr(node, 'end_lineno') else start_line + 10
+        exact_hash, minhash = fingerprint_function(node)
+
+        record = {
+            "name": node.name,
+            "qualname": ".".join(self._scope + [node.name]),
+            "is_async": isinstance(node, ast.AsyncFunctionDef),
+            "code": '\n'.join(self.source_lines[start_line:end_line]),
+            "args": [arg.arg for arg in node.args.args],
+            "docstring": ast.get_docstring(node) or "",
+            "line_start": node.lineno,
+            "line_end": node.end_lineno if hasattr(node, 'end_lineno') else None,
+            "loc": end_line - start_line,
+            "cyclomatic": 1,
+            "max_nesting": 0,
+            "loops": 0,
+            "recursive": False,
+            # Normalized-AST hash and MinHash signature for duplicate detection
+            "fingerprint": exact_hash,
+            "minhash": minhash
+        }
+        self.functions.append(record)
+
+        self._frames.append(record)
+        self._scope.extend([node.name, "<locals>"])
+        for stmt in node.body:
+            self.visit(stmt, 0, loop_depth)
+        del self._scope[-2:]
+        self._frames.pop()
+
+    @staticmethod
+    def _is_self_call(func, name: str) -> bool:
+        if isinstance(func, ast.Name):
+            return func.id == name
+        return (isinstance(func, ast.Attribute) and func.attr == name
+                and isinstance(func.value, ast.Name) and func.value.id in ("self", "cls"))
+
+def analyze_tree(tree: ast.AST, code: str) -> FunctionMetricsVisitor:
+    """Run the single-pass metrics visitor over a parsed module"""
+    visitor = FunctionMetricsVisitor(code.splitlines())
+    visitor.visit(tree)
+    return visitor
+
+def extract_functions_from_code(code: str, file_path: str) -> List[Dict]:
+    """
+    Extract individual functions from Python code using AST
+    Returns list of function dictionaries with code, name, metrics and metadata
+    """
+    try:
+        tree = ast.parse(code, filename=file_path)
+        return analyze_tree(tree, code).functions
+    except Exception as e:
+        print(f"Error extracting functions: {e}")
+        return []
+
+def estimate_time_complexity(max_loop_depth: int, has_recursion: bool) -> str:
+    if has_recursion:
+        return "O(2^n)"
+    elif max_loop_depth == 0:
+        return "O(1)"
+    elif max_loop_depth == 1:
+        return "O(n)"
+    elif max_loop_depth == 2:
+        return "O(n²)"
+    elif max_loop_depth == 3:
+        return "O(n³)"
+    else:
+        return f"O(n^{max_loop_depth})"
+
+def hotspot_key(func: Dict):
+    return (func.get("cyclomatic", 0), func.get("max_nesting", 0), func.get("loc", 0))
+
+def rank_hotspots(functions: List[Dict], limit: int = HOTSPOT_COUNT) -> List[Dict]:
+    """Worst functions first, by cyclomatic complexity, then nesting, then size"""
+    return sorted(functions, key=hotspot_key, reverse=True)[:limit]
+
+def analyze_file(path: str) -> Tuple[Dict, List[str]]:
+    """Analyze one Python file; returns (stats, errors). Blocking, so callers run it off the event loop"""
+    start = datetime.datetime.now() 
+    stats = {
+        "functions": 0, 
+        "variables": 0, 
+        "classes": 0, 
+        "imports": 0, 
+        "lines": 0, 
+        "complexity": 0, 
+        "FOR": 0, 
+        "database": [], 
+        'database_name': [], 
+        'time_complexity': 'O(1)',
+        'file_bytes': '',
+        'function_details': [],  # Store detailed function analysis
+        'hotspots': [],  # Top functions by complexity, precomputed for the results views
+        'minhashes': []  # Aligned with function_details, popped before storage
+    }
+    errors = []
+    
+    try:
+        with profile_stage("read_source"):
+            with open(path, "r", encoding="utf-8") as f:
+                code = f.read()
+                stats["lines"] = len(code.splitlines())
+        
+            file_size = os.path.getsize(path)
+            if file_size <= 1024:
+                ranges = f'KB: {file_size} bytes'
+            elif file_size > 1024 and file_size <= (1024 * 1024):
+                ranges = f'MB: {file_size / 1024:.2f} KB'
+            elif file_size > (1024 * 1024) and file_size <= (1024 * 1024 * 1024):
+                ranges = f'GB: {file_size / (1024 * 1024):.2f} MB'
+            else:
+                ranges = f'{file_size / (1024 * 1024 * 1024):.2f} GB'
+        
+            stats['file_bytes'] = ranges
+        
+        with profile_stage("db_detection"):
+            keywords = ["mysql.connector.connect", "sqlite3.connect", "psycopg2.connect"]
+            for kw in keywords:
+                if re.search(r'\b' + re.escape(kw) + r'\b', code):
+                    stats['database'].append(kw)
+        
+            def detect_db_name(code):
+                match = re.search(
+                    r"mysql\.connector\.connect\([^)]*database\s*=\s*['\"]([\w]+)['\"]",
+                    code, re.DOTALL)
+                if match:
+                    return match.group(1)
+            
+                match = re.search(r"sqlite3\.connect\(\s*['\"]([\w\.-]+)['\"]\s*\)", code)
+                if match:
+                    return match.group(1)
+            
+                match = re.search(
+                    r"psycopg2\.connect\([^)]*database\s*=\s*['\"]([\w]+)['\"]",
+                    code, re.DOTALL)
+                if match:
+                    return match.group(1)
+            
+                return None
+        
+            db_name = detect_db_name(code)
+            if db_name:
+                stats['database_name'].append(db_name)
+        
+        with profile_stage("parse_ast"):
+            tree = ast.parse(code, filename=path)
+        
+        with profile_stage("analyze_tree"):
+            # Function metrics and file-level counts in one traversal, plus a
+            # fingerprint walk per function
+            visitor = analyze_tree(tree, code)
+            extracted_functions = visitor.functions
+            stats.update(visitor.counts)
+            stats["functions"] = len(extracted_functions)
+            stats['time_complexity'] = estimate_time_complexity(
+                visitor.max_loop_depth,
+                any(func["recursive"] for func in extracted_functions)
+            )
+        
+            # Store function details
+            for func in extracted_functions:
+                stats['function_details'].append({
+                    key: value for key, value in func.items()
+                    if key not in ("code", "minhash")
+                })
+                stats['minhashes'].append(func["minhash"])
+            stats['hotspots'] = [
+                {key: func[key] for key in HOTSPOT_FIELDS}
+                for func in rank_hotspots(extracted_functions)
+            ]
+    except SyntaxError as e:
+        errors.append(f"Syntax Error: line {e.lineno}")
+    except Exception as e:
+        errors.append(f"Error: {str(e)}")
+    
+    stats["complexity"] = (datetime.datetime.now() - start).total_seconds()
+    return stats, errors
+
+def build_results(list_key: str, stats_prefix: str, paths: List[str], results: List[Tuple[Dict, List[str]]]) -> Dict:
+    """Group per-file (stats, errors) into the results_main / results_sub layout stored in Details.data"""
+    section = {list_key: [Path(p).name for p in paths], "total_files": len(paths), "stats": {}, "errors": {}}
+    for i, (stats, errs) in enumerate(results, 1):
+        section["stats"][f"{stats_prefix}{i}"] = stats
+        section["errors"][f"{stats_prefix}{i}"] = errs
+    return section
+
+def iter_analyzed_files(results_main: Dict, results_sub: Dict):
+    """Yield (file_name, stats) for every analyzed main and sub file"""
+    for i, file_name in enumerate(results_main.get("main_file", []), start=1):
+        yield file_name, results_main.get("stats", {}).get(f"main_file{i}", {})
+    for i, file_name in enumerate(results_sub.get("sub_files", []), start=1):
+        yield file_name, results_sub.get("stats", {}).get(f"subfile{i}", {})
+
+def collect_fingerprints(results_main: Dict, results_sub: Dict) -> List[Dict]:
+    """
+    Pull MinHash signatures out of the analysis stats
+    Signatures are only kept in the fingerprint index, not in Details.data
+    """
+    fingerprints = []
+    for file_name, stats in iter_analyzed_files(results_main, results_sub):
+        minhashes = stats.pop("minhashes", [])
+        for detail, minhash in zip(stats.get("function_details", []), minhashes):
+            fingerprints.append({
+                "file_name": file_name,
+                "function_name": detail.get("qualname", detail["name"]),
+                "line_start": detail["line_start"],
+                "exact_hash": detail["fingerprint"],
+                "minhash": minhash
+            })
+    return fingerprints
+
+def project_hotspots(results_main: Dict, results_sub: Dict, limit: int = HOTSPOT_COUNT) -> List[Dict]:
+    """Merge the per-file hotspot lists into the project's worst functions"""
+    candidates = [
+        dict(hotspot, file_name=file_name)
+        for file_name, stats in iter_analyzed_files(results_main, results_sub)
+        for hotspot in stats.get("hotspots", [])
+    ]
+    return rank_hotspots(candidates, limit)
+
+def find_main_file(paths: List[str]) -> Tuple[List[str], List[str]]:
+    main_files, other_files = [], []
+    for path in paths:
+        try:
+            with open(path, "r") as f:
+                code = f.read()
+            tree = ast.parse(code)
+            has_main = any(
+                isinstance(node, ast.If) and
+                isinstance(node.test, ast.Compare) and
+                isinstance(node.test.left, ast.Name) and
+                node.test.left.id == "__name__"
+                for node in ast.walk(tree)
+            )
+            (main_files if has_main else other_files).append(path)
+        except:
+            other_files.append(path)
+    return other_files, main_files
+
+def analyze_project(project_name: str, paths: List[str], upload_errors: List[str], username: str, user_id: int) -> Dict:
+    """
+    Analyze one project for bulk ingestion; runs in a worker process
+    Returns the Details.data payload (without project_id), fingerprints with
+    their band keys, and the rows for the search index.
+    """
+    sub, main = find_main_file(paths)
+    results_main = build_results("main_file", "main_file", main, [analyze_file(p) for p in main])
+    results_sub = build_results("sub_files", "subfile", sub, [analyze_file(p) for p in sub])
+
+    fingerprints = collect_fingerprints(results_main, results_sub)
+    for fp in fingerprints:
+        fp["band_keys"] = lsh_band_keys(fp["minhash"])
+
+    data = {
+        "results_main": results_main,
+        "results_sub": results_sub,
+        "files_list": {"file_list": [Path(p).name for p in paths]},
+        "upload_errors": upload_errors,
+        "hotspots": project_hotspots(results_main, results_sub),
+        "project_name": project_name,
+        "username": username,
+        "user_id": user_id
+    }
+    functions = [
+        dict(detail, file_name=file_name)
+        for file_name, stats in iter_analyzed_files(results_main, results_sub)
+        for detail in stats.get("function_details", [])
+    ]
+    return {
+        "project_name": project_name,
+        # Same round trip run_analysis falls back to for unserializable values
+        "data": json.loads(json.dumps(data, default=str)),
+        "fingerprints": fingerprints,
+        "functions": functions
+    }
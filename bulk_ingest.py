@@ -0,0 +1,278 @@
+"""
+Bulk ingestion of many projects
+
+Projects are analyzed in parallel worker processes and written in batches.
+Each batch is one transaction with one Core insert() per table (projects,
+details, file_metrics, file_drivers, fingerprints, bands, search index),
+instead of a commit and refresh per row as in /analyze. SQLAlchemy's
+insertmanyvalues turns each into multi-row INSERTs on Postgres (psycopg2);
+SQLite runs an in-process executemany. If a batch fails, its projects are retried
+one transaction each, so a bad project is reported on its own and the rest
+of the batch is still saved; batches already committed are never rolled back.
+
+    python bulk_ingest.py --user-id 1 --batch-size 50 --workers 4 --nested projects/
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from dynamic import Projects, Details, FileMetrics, FileDrivers, FunctionFingerprints, FingerprintBands
+from analysis import analyze_project
+from metrics import file_metric_values
+from search import FUNCTION_SEARCH, search_rows
+
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "50"))
+BULK_WORKERS = int(os.getenv("BULK_WORKERS", str(os.cpu_count() or 1)))
+MAX_BATCH_SIZE = 1000
+
+_shared_pool: Optional[ProcessPoolExecutor] = None
+_shared_pool_lock = threading.Lock()
+
+
+def shared_pool() -> ProcessPoolExecutor:
+    """
+    One BULK_WORKERS-sized pool per server process, shared by all bulk requests
+    Workers are spawned rather than forked: the server is multithreaded and
+    runs an event loop, which a forked child would inherit mid-flight.
+    """
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is None or getattr(_shared_pool, "_broken", False):
+            _shared_pool = ProcessPoolExecutor(
+                max_workers=BULK_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _shared_pool
+
+
+def shutdown_shared_pool():
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is not None:
+            _shared_pool.shutdown(cancel_futures=True)
+            _shared_pool = None
+
+
+def _insert_ids(db: Session, model, rows: List[Dict]) -> List[int]:
+    """Multi-row INSERT returning the new ids in the order of rows"""
+    if not rows:
+        return []
+    return db.execute(insert(model).returning(model.id, sort_by_parameter_order=True), rows).scalars().all()
+
+
+def write_batch(db: Session, user_id: int, projects: List[Dict]) -> List[int]:
+    """Insert analyzed projects with one statement per table; the caller commits"""
+    project_ids = _insert_ids(db, Projects, [
+        {"user_id": user_id, "project_name": p["project_name"]} for p in projects
+    ])
+    detail_ids = _insert_ids(db, Details, [
+        {"project_id": project_id, "data": dict(p["data"], project_id=project_id)}
+        for project_id, p in zip(project_ids, projects)
+    ])
+
+    metrics = [
+        entry
+        for project_id, detail_id, p in zip(project_ids, detail_ids, projects)
+        for entry in file_metric_values(user_id, project_id, detail_id, p["data"])
+    ]
+    metric_ids = _insert_ids(db, FileMetrics, [values for values, _ in metrics])
+    drivers = [
+        {"file_metric_id": metric_id, "user_id": user_id, "project_id": values["project_id"], "driver": driver}
+        for metric_id, (values, names) in zip(metric_ids, metrics)
+        for driver in names
+    ]
+    if drivers:
+        db.execute(insert(FileDrivers), drivers)
+
+    fingerprints = [
+        (project_id, fp)
+        for project_id, p in zip(project_ids, projects)
+        for fp in p["fingerprints"]
+    ]
+    fingerprint_ids = _insert_ids(db, FunctionFingerprints, [
+        {
+            "user_id": user_id,
+            "project_id": project_id,
+            "file_name": fp["file_name"],
+            "function_name": fp["function_name"],
+            "line_start": fp["line_start"],
+            "exact_hash": fp["exact_hash"],
+            "minhash": fp["minhash"]
+        }
+        for project_id, fp in fingerprints
+    ])
+    bands = [
+        {"fingerprint_id": fingerprint_id, "user_id": user_id, "band_key": key}
+        for fingerprint_id, (_, fp) in zip(fingerprint_ids, fingerprints)
+        for key in fp["band_keys"]
+    ]
+    if bands:
+        db.execute(insert(FingerprintBands), bands)
+
+    search = [
+        row
+        for project_id, p in zip(project_ids, projects)
+        for row in search_rows(user_id, project_id, p["functions"])
+    ]
+    if search:
+        db.execute(insert(FUNCTION_SEARCH), search)
+
+    return project_ids
+
+
+def _flush(db: Session, user_id: int, batch: List[tuple], report: List[Optional[Dict]]):
+    """Commit a batch; on failure retry each project alone so only the bad ones are reported"""
+    if not batch:
+        return
+    try:
+        project_ids = write_batch(db, user_id, [payload for _, payload in batch])
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"Warning: Batch of {len(batch)} projects failed, retrying one at a time: {e}")
+        for index, payload in batch:
+            try:
+                project_id, = write_batch(db, user_id, [payload])
+                db.commit()
+                report[index].update(status="saved", project_id=project_id)
+            except Exception as e:
+                db.rollback()
+                report[index].update(status="failed", stage="write", error=str(e))
+        return
+    for (index, _), project_id in zip(batch, project_ids):
+        report[index].update(status="saved", project_id=project_id)
+
+
+def ingest(
+    db: Session,
+    projects: List[Dict],
+    user_id: int,
+    username: str = "User",
+    batch_size: int = BULK_BATCH_SIZE,
+    workers: int = BULK_WORKERS,
+    pool: Optional[Executor] = None
+) -> Dict:
+    """
+    Analyze and store projects given as {"project_name", "paths", "upload_errors"}
+    Analysis runs on pool if given (left running), otherwise in a pool of
+    up to workers processes for this call. Batches are written as analyses
+    finish, so writing overlaps analysis. Returns a per-project report in
+    input order.
+    """
+    if not 1 <= batch_size <= MAX_BATCH_SIZE:
+        raise ValueError(f"batch_size must be between 1 and {MAX_BATCH_SIZE}")
+    started = time.perf_counter()
+    report = [{"project_name": p["project_name"], "files": len(p["paths"])} for p in projects]
+    jobs = []
+    for index, p in enumerate(projects):
+        # Files rejected before analysis (wrong type, too large); kept whether or not the project saves
+        if p.get("upload_errors"):
+            report[index]["upload_errors"] = p["upload_errors"]
+        if p["paths"]:
+            jobs.append((index, (p["project_name"], p["paths"], p.get("upload_errors", []), username, user_id)))
+        else:
+            report[index].update(status="failed", stage="upload", error="No files uploaded")
+
+    batch = []
+
+    def collect(index: int, analyze):
+        nonlocal batch
+        try:
+            batch.append((index, analyze()))
+        except Exception as e:
+            report[index].update(status="failed", stage="analysis", error=str(e))
+            return
+        if len(batch) >= batch_size:
+            _flush(db, user_id, batch, report)
+            batch = []
+
+    def run(executor: Executor):
+        futures = {executor.submit(analyze_project, *args): index for index, args in jobs}
+        for future in as_completed(futures):
+            collect(futures[future], future.result)
+
+    workers = max(1, min(workers, len(jobs)))
+    if pool is not None:
+        run(pool)
+    elif workers == 1:
+        for index, args in jobs:
+            collect(index, lambda: analyze_project(*args))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as local_pool:
+            run(local_pool)
+    _flush(db, user_id, batch, report)
+
+    saved = sum(1 for r in report if r.get("status") == "saved")
+    return {
+        "user_id": user_id,
+        "batch_size": batch_size,
+        "workers": workers,
+        "saved": saved,
+        "failed": len(report) - saved,
+        "seconds": round(time.perf_counter() - started, 3),
+        "projects": report
+    }
+
+
+def _project_dirs(paths: List[str], nested: bool) -> List[Path]:
+    dirs = []
+    for path in map(Path, paths):
+        if nested:
+            dirs.extend(sorted(p for p in path.iterdir() if p.is_dir() and not p.name.startswith(".")))
+        else:
+            dirs.append(path)
+    return dirs
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Analyze and store many projects in batches")
+    parser.add_argument("directories", nargs="+", help="project directories (.py files are collected recursively)")
+    parser.add_argument("--nested", action="store_true", help="treat each subdirectory of the given directories as a project")
+    parser.add_argument("--user-id", type=int, required=True)
+    parser.add_argument("--username", default="User")
+    parser.add_argument("--batch-size", type=int, default=BULK_BATCH_SIZE, help="projects per transaction")
+    parser.add_argument("--workers", type=int, default=BULK_WORKERS, help="analysis processes")
+    parser.add_argument("--json", help="also write the full report to this file")
+    args = parser.parse_args(argv)
+
+    from database import SessionLocal
+    from dynamic import Authenticate
+    from init_db import init_database
+
+    projects = [
+        {"project_name": d.name, "paths": [str(p) for p in sorted(d.rglob("*.py"))], "upload_errors": []}
+        for d in _project_dirs(args.directories, args.nested)
+    ]
+    init_database()
+    db = SessionLocal()
+    try:
+        if not db.query(Authenticate).filter(Authenticate.id == args.user_id).first():
+            print(f"✗ User {args.user_id} not found")
+            return 1
+        report = ingest(db, projects, args.user_id, args.username, args.batch_size, args.workers)
+    finally:
+        db.close()
+
+    for entry in report["projects"]:
+        if entry.get("status") != "saved":
+            print(f"✗ {entry['project_name']}: {entry['stage']} failed: {entry['error']}")
+    print(f"✓ Saved {report['saved']} of {len(projects)} projects in {report['seconds']}s "
+          f"(batch size {report['batch_size']}, {report['workers']} workers)")
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump(report, fh, indent=2)
+    return 0 if report["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,165 @@
+"""
+Resumable chunked uploads
+
+A session is a directory holding meta.json and one .part file per received
+chunk. Chunks are written atomically, so a chunk file either exists whole
+(and passed its checksum) or not at all; the set of .part files is the
+source of truth for what the client still has to send.
+"""
+import hashlib
+import json
+import math
+import os
+import re
+import shutil
+import time
+import uuid
+from typing import Dict, List
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+MAX_CHUNK_SIZE = 8 * 1024 * 1024
+SESSION_TTL_SECONDS = 24 * 60 * 60
+
+_SESSION_ID = re.compile(r"^[0-9a-f]{32}$")
+
+
+class UploadSessionError(Exception):
+    """Raised for invalid requests against an upload session"""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class UploadSessionStore:
+    def __init__(self, root: str):
+        self.root = root
+
+    def _session_dir(self, session_id: str) -> str:
+        if not _SESSION_ID.match(session_id or ""):
+            raise UploadSessionError("Unknown upload session", 404)
+        path = os.path.join(self.root, session_id)
+        if not os.path.isdir(path):
+            raise UploadSessionError("Unknown upload session", 404)
+        return path
+
+    def create(self, files: List[Dict], chunk_size: int, **fields) -> Dict:
+        """
+        Start a session for already-validated files
+        files is a list of {"name", "size"}; extra fields are kept in meta.json
+        """
+        if not 0 < chunk_size <= MAX_CHUNK_SIZE:
+            raise UploadSessionError(f"chunk_size must be between 1 and {MAX_CHUNK_SIZE} bytes")
+        self.expire_stale()
+
+        session_id = uuid.uuid4().hex
+        meta = dict(
+            fields,
+            session_id=session_id,
+            chunk_size=chunk_size,
+            created_at=time.time(),
+            files=[
+                dict(f, index=i, total_chunks=max(1, math.ceil(f["size"] / chunk_size)))
+                for i, f in enumerate(files)
+            ]
+        )
+        path = os.path.join(self.root, session_id)
+        os.makedirs(path)
+        with open(os.path.join(path, "meta.json"), "w") as fh:
+            json.dump(meta, fh)
+        return meta
+
+    def load(self, session_id: str) -> Dict:
+        with open(os.path.join(self._session_dir(session_id), "meta.json")) as fh:
+            return json.load(fh)
+
+    def expected_chunk_size(self, session_id: str, file_index: int, chunk_index: int) -> int:
+        """Byte length the given chunk must have; validates both indexes"""
+        meta = self.load(session_id)
+        if not 0 <= file_index < len(meta["files"]):
+            raise UploadSessionError("file_index out of range", 404)
+        file = meta["files"][file_index]
+        if not 0 <= chunk_index < file["total_chunks"]:
+            raise UploadSessionError("chunk_index out of range", 404)
+        chunk_size = meta["chunk_size"]
+        return min(chunk_size, file["size"] - chunk_index * chunk_size)
+
+    def write_chunk(self, session_id: str, file_index: int, chunk_index: int, data: bytes, checksum: str) -> bool:
+        """
+        Store one chunk after checking its size and SHA-256
+        Returns False if the chunk was already received (nothing is rewritten)
+        """
+        expected = self.expected_chunk_size(session_id, file_index, chunk_index)
+
+        part = os.path.join(self._session_dir(session_id), f"{file_index}.{chunk_index}.part")
+        if os.path.exists(part):
+            return False
+
+        if len(data) != expected:
+            raise UploadSessionError(f"Chunk must be {expected} bytes, got {len(data)}")
+        if not checksum or hashlib.sha256(data).hexdigest() != checksum.lower():
+            raise UploadSessionError("Chunk checksum mismatch", 422)
+
+        tmp = f"{part}.{uuid.uuid4().hex}.tmp"
+        with open(tmp, "wb") as fh:
+            fh.write(data)
+        os.replace(tmp, part)
+        return True
+
+    def status(self, session_id: str) -> Dict:
+        """Received and missing chunk indexes for every file in the session"""
+        meta = self.load(session_id)
+        received: Dict[int, List[int]] = {f["index"]: [] for f in meta["files"]}
+        for entry in os.listdir(self._session_dir(session_id)):
+            match = re.match(r"^(\d+)\.(\d+)\.part$", entry)
+            if match and int(match.group(1)) in received:
+                received[int(match.group(1))].append(int(match.group(2)))
+
+        files = []
+        for f in meta["files"]:
+            got = sorted(received[f["index"]])
+            files.append({
+                "index": f["index"],
+                "name": f["name"],
+                "size": f["size"],
+                "total_chunks": f["total_chunks"],
+                "received": got,
+                "missing": sorted(set(range(f["total_chunks"])) - set(got)),
+            })
+        return {
+            "session_id": session_id,
+            "chunk_size": meta["chunk_size"],
+            "files": files,
+            "complete": all(not f["missing"] for f in files),
+        }
+
+    def assemble(self, session_id: str, dest_dir: str) -> List[str]:
+        """Concatenate every file's chunks into dest_dir; all chunks must be present"""
+        status = self.status(session_id)
+        if not status["complete"]:
+            raise UploadSessionError("Upload incomplete", 409)
+
+        session_dir = self._session_dir(session_id)
+        paths = []
+        for f in status["files"]:
+            path = os.path.join(dest_dir, f["name"])
+            with open(path, "wb") as out:
+                for chunk_index in range(f["total_chunks"]):
+                    with open(os.path.join(session_dir, f"{f['index']}.{chunk_index}.part"), "rb") as part:
+                        shutil.copyfileobj(part, out)
+            paths.append(path)
+        return paths
+
+    def delete(self, session_id: str):
+        shutil.rmtree(self._session_dir(session_id), ignore_errors=True)
+
+    def expire_stale(self):
+        """Remove sessions older than SESSION_TTL_SECONDS"""
+        if not os.path.isdir(self.root):
+            os.makedirs(self.root, exist_ok=True)
+            return
+        cutoff = time.time() - SESSION_TTL_SECONDS
+        for entry in os.listdir(self.root):
+            path = os.path.join(self.root, entry)
+            if _SESSION_ID.match(entry) and os.path.getmtime(path) < cutoff:
+                shutil.rmtree(path, ignore_errors=True)
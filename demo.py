@@ -1,39 +1,155 @@
+import time
+_import_started = time.perf_counter()
+
 from fastapi import FastAPI, File, Form, UploadFile, Request, Depends, HTTPException
-from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
+from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse, Response, JSONResponse
+from fastapi.middleware.gzip import GZipMiddleware
 from typing import List, Tuple, Dict
 from sqlalchemy.orm import Session
-from passlib.context import CryptContext
-import ast
 from pathlib import Path
 import asyncio
-import datetime
-import re
 import os
 import json
+import csv
+import io
+import threading
+import shutil
+import uuid
+
+from database import SessionLocal, engine
+from dynamic import Authenticate, Projects, Details, FunctionFingerprints, FingerprintBands
+from fingerprint import lsh_band_keys, estimate_similarity
+from analysis import (
+    analyze_file, extract_functions_from_code, build_results, iter_analyzed_files,
+    collect_fingerprints, project_hotspots, find_main_file
+)
+from search import index_functions, search_functions
+from metrics import store_file_metrics, user_summary, project_summary, project_trends
+from page_cache import RenderedPageCache, make_etag, etag_matches
+from init_db import init_database
+from chunked_upload import UploadSessionStore, UploadSessionError, DEFAULT_CHUNK_SIZE
+from bulk_ingest import ingest, shared_pool, shutdown_shared_pool, BULK_BATCH_SIZE, MAX_BATCH_SIZE
+import profiling
+from profiling import request_profile, stage as profile_stage
+
+try:
+    # Optional: brotli with gzip fallback when the client does not accept br
+    from brotli_asgi import BrotliMiddleware
+except ImportError:
+    BrotliMiddleware = None
+from sqlalchemy import text, func, and_
+from sqlalchemy.orm import aliased
+
+class _Lazy:
+    """
+    Build an object on first attribute access
+    Without PREWARM=1, a worker imports passlib and Jinja only when it first
+    hashes a password or renders a page
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._obj = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        if self._obj is None:
+            with self._lock:
+                if self._obj is None:
+                    self._obj = self._factory()
+        return self._obj
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
 
-from database import SessionLocal, engine, Base
-from dynamic import Authenticate, Projects, Details
-from sqlalchemy import text
+def _make_pwd_context():
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+TEMPLATES_DIR = Path(__file__).resolve().parent / "templates"
+
+def _make_templates():
+    from fastapi.templating import Jinja2Templates
+    return Jinja2Templates(directory=str(TEMPLATES_DIR))
+
+pwd_context = _Lazy(_make_pwd_context)
+templates = _Lazy(_make_templates)
 
 app = FastAPI()
-templates = Jinja2Templates(directory="templates")
+# Rendered /final pages per worker; bounded by total size as pages can be large
+rendered_pages = RenderedPageCache(
+    max_entries=int(os.getenv("PAGE_CACHE_ENTRIES", "256")),
+    max_chars=int(os.getenv("PAGE_CACHE_MB", "32")) * 1024 * 1024
+)
+
+# Set by gunicorn.conf.py, which initializes the schema once in the master
+SKIP_DB_INIT = os.getenv("SKIP_DB_INIT", "0") == "1"
+# Opt-in eager warm-up in the startup hook; gunicorn.conf.py warms the master instead
+PREWARM = os.getenv("PREWARM", "0") == "1"
+POOL_WARM_CONNECTIONS = int(os.getenv("POOL_WARM_CONNECTIONS", "2"))
+STARTUP_TIMINGS: Dict[str, float] = {}
+_prewarmed = False
+
+# results.html / final.html run to hundreds of KB for big projects
+if BrotliMiddleware is not None:
+    app.add_middleware(BrotliMiddleware, minimum_size=1000)
+else:
+    app.add_middleware(GZipMiddleware, minimum_size=1000)
+
+def prewarm():
+    """
+    Load templates, the bcrypt backend and the analysis path ahead of traffic
+    Safe to call in a gunicorn master with preload_app: nothing here opens
+    sockets or DB connections, so forked workers inherit the warm state.
+    """
+    global _prewarmed
+    if _prewarmed:
+        return
+    started = time.perf_counter()
+    env = templates.env
+    for name in env.list_templates(extensions=["html"]):
+        env.get_template(name)
+    pwd_context.handler("bcrypt").get_backend()
+    extract_functions_from_code("def warm(x):\n    return [i for i in x if i]\n", "<prewarm>")
+    _prewarmed = True
+    STARTUP_TIMINGS["prewarm_seconds"] = round(time.perf_counter() - started, 4)
+
+def warm_pool(connections: int = POOL_WARM_CONNECTIONS):
+    """Open and return pooled DB connections so the first requests skip the handshake"""
+    opened = [engine.connect() for _ in range(connections)]
+    for conn in opened:
+        conn.close()
 
 @app.on_event("startup")
 async def startup_event():
+    started = time.perf_counter()
+    if not SKIP_DB_INIT:
+        try:
+            init_database()
+            print("✓ Database initialized")
+        except Exception as e:
+            print(f"⚠ Database connection issue (non-critical): {e}")
+            print("✓ Application will continue without database")
+
+    if PREWARM:
+        prewarm()
     try:
-        Base.metadata.create_all(bind=engine)
-        print("✓ Database initialized")
+        await asyncio.to_thread(warm_pool)
     except Exception as e:
-        print(f"⚠ Database connection issue (non-critical): {e}")
-        print("✓ Application will continue without database")
+        print(f"⚠ Connection pool warm-up skipped: {e}")
+
+    STARTUP_TIMINGS["startup_seconds"] = round(time.perf_counter() - started, 4)
+    print(f"✓ Worker {os.getpid()} ready: {STARTUP_TIMINGS}")
+
+@app.on_event("shutdown")
+def shutdown_event():
+    shutdown_shared_pool()
 
 UPLOAD_FOLDER = "uploads"
 MAX_FILE_SIZE = 10 * 1024 * 1024
 ALLOWED_EXTENSIONS = {".py"}
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+upload_sessions = UploadSessionStore(os.path.join(UPLOAD_FOLDER, ".sessions"))
 
 def get_db():
     db = SessionLocal()
@@ -52,209 +168,32 @@ def validate_file(filename: str) -> Tuple[bool, str]:
         return False, "Only .py files"
     return True, name
 
-def extract_functions_from_code(code: str, file_path: str) -> List[Dict]:
-    """
-    Extract individual functions from Python code using AST
-    Returns list of function dictionaries with code, name, and metadata
-    """
-    functions = []
-    try:
-        tree = ast.parse(code, filename=file_path)
-        source_lines = code.splitlines()
-        
-        for node in ast.walk(tree):
-            if isinstance(node, ast.FunctionDef):
-                # Get function source code
-                start_line = node.lineno - 1
-                end_line = node.end_lineno if hasattr(node, 'end_lineno') else start_line + 10
-                function_code = '\n'.join(source_lines[start_line:end_line])
-                
-                # Get function signature
-                args = [arg.arg for arg in node.args.args]
-                
-                # Get docstring
-                docstring = ast.get_docstring(node) or ""
-                
-                functions.append({
-                    "name": node.name,
-                    "code": function_code,
-                    "args": args,
-                    "docstring": docstring,
-                    "line_start": node.lineno,
-                    "line_end": node.end_lineno if hasattr(node, 'end_lineno') else None
-                })
-    except Exception as e:
-        print(f"Error extracting functions: {e}")
-    
-    return functions
-
 async def analyze_code(file_path: str):
-    def parse(path: str):
-        start = datetime.datetime.now() 
-        stats = {
-            "functions": 0, 
-            "variables": 0, 
-            "classes": 0, 
-            "imports": 0, 
-            "lines": 0, 
-            "complexity": 0, 
-            "FOR": 0, 
-            "database": [], 
-            'database_name': [], 
-            'time_complexity': 'O(1)',
-            'file_bytes': '',
-            'function_details': []  # Store detailed function analysis
-        }
-        errors = []
-        
-        try:
-            with open(path, "r", encoding="utf-8") as f:
-                code = f.read()
-                stats["lines"] = len(code.splitlines())
-            
-            file_size = os.path.getsize(path)
-            if file_size <= 1024:
-                ranges = f'KB: {file_size} bytes'
-            elif file_size > 1024 and file_size <= (1024 * 1024):
-                ranges = f'MB: {file_size / 1024:.2f} KB'
-            elif file_size > (1024 * 1024) and file_size <= (1024 * 1024 * 1024):
-                ranges = f'GB: {file_size / (1024 * 1024):.2f} MB'
-            else:
-                ranges = f'{file_size / (1024 * 1024 * 1024):.2f} GB'
-            
-            stats['file_bytes'] = ranges
-            
-            keywords = ["mysql.connector.connect", "sqlite3.connect", "psycopg2.connect"]
-            for kw in keywords:
-                if re.search(r'\b' + re.escape(kw) + r'\b', code):
-                    stats['database'].append(kw)
-            
-            def detect_db_name(code):
-                match = re.search(
-                    r"mysql\.connector\.connect\([^)]*database\s*=\s*['\"]([\w]+)['\"]",
-                    code, re.DOTALL)
-                if match:
-                    return match.group(1)
-                
-                match = re.search(r"sqlite3\.connect\(\s*['\"]([\w\.-]+)['\"]\s*\)", code)
-                if match:
-                    return match.group(1)
-                
-                match = re.search(
-                    r"psycopg2\.connect\([^)]*database\s*=\s*['\"]([\w]+)['\"]",
-                    code, re.DOTALL)
-                if match:
-                    return match.group(1)
-                
-                return None
-            
-            db_name = detect_db_name(code)
-            if db_name:
-                stats['database_name'].append(db_name)
-            
-            tree = ast.parse(code, filename=path)
-            
-
-            def detect_time_complexity(tree):
-                
-                max_nesting = 0
-                has_recursion = False
-                
-                def get_loop_depth(node, current_depth=0):
-                    nonlocal max_nesting
-                    
-                    if isinstance(node, (ast.For, ast.While)):
-                        current_depth += 1
-                        max_nesting = max(max_nesting, current_depth)
-                    
-                    for child in ast.iter_child_nodes(node):
-                        get_loop_depth(child, current_depth)
-                
-                def check_recursion(node):
-                    nonlocal has_recursion
-                    
-                    if isinstance(node, ast.FunctionDef):
-                        func_name = node.name
-                        for child in ast.walk(node):
-                            if isinstance(child, ast.Call):
-                                if isinstance(child.func, ast.Name) and child.func.id == func_name:
-                                    has_recursion = True
-                                    return
-                
-                for node in ast.walk(tree):
-                    check_recursion(node)
-                
-                get_loop_depth(tree)
-                
-                if has_recursion:
-                    return "O(2^n)"
-                elif max_nesting == 0:
-                    return "O(1)"
-                elif max_nesting == 1:
-                    return "O(n)"
-                elif max_nesting == 2:
-                    return "O(n²)"
-                elif max_nesting == 3:
-                    return "O(n³)"
-                else:
-                    return f"O(n^{max_nesting})"
-            
-            stats['time_complexity'] = detect_time_complexity(tree)
-            
-            # Extract and analyze functions
-            extracted_functions = extract_functions_from_code(code, path)
-            stats["functions"] = len(extracted_functions)
-            
-            # Store function details
-            for func in extracted_functions:
-                stats['function_details'].append({
-                    "name": func["name"],
-                    "args": func["args"],
-                    "docstring": func["docstring"],
-                    "line_start": func["line_start"],
-                    "line_end": func["line_end"]
-                })
-            
-            for node in ast.walk(tree):
-                if isinstance(node, ast.ClassDef):
-                    stats["classes"] += 1
-                elif isinstance(node, ast.For):
-                    stats["FOR"] += 1
-                elif isinstance(node, (ast.Import, ast.ImportFrom)):
-                    stats["imports"] += 1
-                elif isinstance(node, ast.Assign):
-                    stats["variables"] += 1
-        except SyntaxError as e:
-            errors.append(f"Syntax Error: line {e.lineno}")
-        except Exception as e:
-            errors.append(f"Error: {str(e)}")
-        
-        stats["complexity"] = (datetime.datetime.now() - start).total_seconds()
-        return stats, errors
-    
     # Run basic parsing
-    stats, errors = await asyncio.to_thread(parse, file_path)
+    stats, errors = await asyncio.to_thread(analyze_file, file_path)
     
     return stats, errors
 
-def find_main_file(paths: List[str]) -> Tuple[List[str], List[str]]:
-    main_files, other_files = [], []
-    for path in paths:
-        try:
-            with open(path, "r") as f:
-                code = f.read()
-            tree = ast.parse(code)
-            has_main = any(
-                isinstance(node, ast.If) and
-                isinstance(node.test, ast.Compare) and
-                isinstance(node.test.left, ast.Name) and
-                node.test.left.id == "__name__"
-                for node in ast.walk(tree)
-            )
-            (main_files if has_main else other_files).append(path)
-        except:
-            other_files.append(path)
-    return other_files, main_files
+def store_fingerprints(db: Session, user_id: int, project_id: int, fingerprints: List[Dict]):
+    """Add function fingerprints and their LSH band keys to the index"""
+    rows = [
+        FunctionFingerprints(
+            user_id=user_id,
+            project_id=project_id,
+            file_name=fp["file_name"],
+            function_name=fp["function_name"],
+            line_start=fp["line_start"],
+            exact_hash=fp["exact_hash"],
+            minhash=fp["minhash"],
+            bands=[
+                FingerprintBands(user_id=user_id, band_key=key)
+                for key in lsh_band_keys(fp["minhash"])
+            ]
+        )
+        for fp in fingerprints
+    ]
+    db.add_all(rows)
+    db.commit()
 
 @app.get('/')
 def root():
@@ -274,9 +213,9 @@ def health_check():
         db = SessionLocal()
         db.execute(text("SELECT 1"))
         db.close()
-        return {"status": "healthy", "database": "connected"}
+        return {"status": "healthy", "database": "connected", "startup": STARTUP_TIMINGS}
     except Exception as e:
-        return {"status": "degraded", "database": "disconnected", "error": str(e)}
+        return {"status": "degraded", "database": "disconnected", "error": str(e), "startup": STARTUP_TIMINGS}
 
 @app.get('/login', response_class=HTMLResponse)
 def login(request: Request):
@@ -375,10 +314,24 @@ async def analyze(
     db: Session = Depends(get_db)
 ):
     """Analyze uploaded Python files and generate code statistics"""
-    saved_files = []
-    errors = []
+    with request_profile(request.headers, "/analyze"):
+        # Reading awaits, so other requests run meanwhile; only the blocking write is a stage
+        uploads, errors = await read_uploaded_files(files)
+        with profile_stage("save_uploads"):
+            saved_files, write_errors = write_uploads(uploads)
+        errors += write_errors
+        return await run_analysis(request, db, saved_files, errors, project_name, username, user_id)
 
-    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+async def save_uploaded_files(files: List[UploadFile], folder: str = UPLOAD_FOLDER) -> Tuple[List[str], List[str]]:
+    """Validate and write uploads to folder; returns (saved paths, errors)"""
+    uploads, errors = await read_uploaded_files(files)
+    saved_files, write_errors = write_uploads(uploads, folder)
+    return saved_files, errors + write_errors
+
+async def read_uploaded_files(files: List[UploadFile]) -> Tuple[List[Tuple[str, bytes]], List[str]]:
+    """Validate uploads and read their contents; returns ((file name, content) pairs, errors)"""
+    uploads = []
+    errors = []
 
     for file in files:
         if not file.filename:
@@ -395,15 +348,51 @@ async def analyze(
             if len(content) > MAX_FILE_SIZE:
                 errors.append(f"{file.filename}: Too large (max {MAX_FILE_SIZE} bytes)")
                 continue
+            uploads.append((result, content))
+        except Exception as e:
+            errors.append(f"{file.filename}: Upload error - {str(e)}")
+            continue
+
+    return uploads, errors
 
-            path = os.path.join(UPLOAD_FOLDER, result)
+def write_uploads(uploads: List[Tuple[str, bytes]], folder: str = UPLOAD_FOLDER) -> Tuple[List[str], List[str]]:
+    """Write (file name, content) pairs to folder; returns (saved paths, errors)"""
+    saved_files = []
+    errors = []
+
+    os.makedirs(folder, exist_ok=True)
+
+    for name, content in uploads:
+        try:
+            path = os.path.join(folder, name)
             with open(path, "wb") as f:
                 f.write(content)
             saved_files.append(path)
         except Exception as e:
-            errors.append(f"{file.filename}: Upload error - {str(e)}")
-            continue
+            errors.append(f"{name}: Upload error - {str(e)}")
+
+    return saved_files, errors
 
+async def analyze_files(paths: List[str]):
+    """
+    Analyze files concurrently
+    Profiled requests run them one at a time so stage memory and cProfile
+    data are not interleaved across threads
+    """
+    if profiling.active():
+        return [await analyze_code(p) for p in paths]
+    return await asyncio.gather(*[analyze_code(p) for p in paths])
+
+async def run_analysis(
+    request: Request,
+    db: Session,
+    saved_files: List[str],
+    errors: List[str],
+    project_name: str,
+    username: str,
+    user_id: int
+):
+    """Analyze saved files, store the results and render results.html"""
     if not saved_files:
         return templates.TemplateResponse("index.html", {
             "request": request,
@@ -413,36 +402,23 @@ async def analyze(
         })
 
     try:
-        sub, main = find_main_file(saved_files)
-
-        results_main = {"main_file": [], "total_files": 0, "stats": {}, "errors": {}}
-        if main:
-            tasks = [analyze_code(p) for p in main]
-            results = await asyncio.gather(*tasks)
-            for i, (stats, errs) in enumerate(results, 1):
-                results_main["stats"][f"main_file{i}"] = stats
-                results_main["errors"][f"main_file{i}"] = errs
-            results_main["main_file"] = [Path(p).name for p in main]
-            results_main["total_files"] = len(main)
-
-        results_sub = {"sub_files": [], "total_files": 0, "stats": {}, "errors": {}}
-        if sub:
-            tasks = [analyze_code(p) for p in sub]
-            results = await asyncio.gather(*tasks)
-            for i, (stats, errs) in enumerate(results, 1):
-                results_sub["stats"][f"subfile{i}"] = stats
-                results_sub["errors"][f"subfile{i}"] = errs
-            results_sub["sub_files"] = [Path(p).name for p in sub]
-            results_sub["total_files"] = len(sub)
+        with profile_stage("find_main_file"):
+            sub, main = find_main_file(saved_files)
+
+        results_main = build_results("main_file", "main_file", main, await analyze_files(main) if main else [])
+        results_sub = build_results("sub_files", "subfile", sub, await analyze_files(sub) if sub else [])
 
         files_list = {"file_list": [Path(f).name for f in saved_files]}
+        fingerprints = collect_fingerprints(results_main, results_sub)
+        hotspots = project_hotspots(results_main, results_sub)
 
         # Save project to database
         try:
-            register = Projects(user_id=user_id, project_name=project_name)
-            db.add(register)
-            db.commit()
-            db.refresh(register)
+            with profile_stage("save_project"):
+                register = Projects(user_id=user_id, project_name=project_name)
+                db.add(register)
+                db.commit()
+                db.refresh(register)
         except Exception as e:
             db.rollback()
             return templates.TemplateResponse("index.html", {
@@ -458,6 +434,7 @@ async def analyze(
             "results_sub": results_sub,
             "files_list": files_list,
             "upload_errors": errors,
+            "hotspots": hotspots,
             "project_name": project_name,
             "username": username,
             "user_id": user_id,
@@ -477,25 +454,55 @@ async def analyze(
             detail = Details(project_id=register.id, data=json.loads(dates))
         
         try:
-            db.add(detail)
-            db.commit()
-            db.refresh(detail)
+            with profile_stage("save_details"):
+                db.add(detail)
+                db.commit()
+                db.refresh(detail)
         except Exception as e:
             db.rollback()
             print(f"Warning: Failed to save project details: {e}")
             # Continue anyway - project is saved, just details failed
 
-        return templates.TemplateResponse("results.html", {
-            "request": request,
-            "results_main": results_main,
-            "results_sub": results_sub,
-            "files_list": files_list,
-            "upload_errors": errors,
-            "project_name": project_name,
-            "username": username,
-            "user_id": user_id,
-            "project_id": register.id
-        })
+        try:
+            with profile_stage("file_metrics"):
+                store_file_metrics(db, user_id, register.id, detail.id, fetch)
+        except Exception as e:
+            db.rollback()
+            print(f"Warning: Failed to save file metrics: {e}")
+
+        rendered_pages.invalidate_user(user_id)
+
+        try:
+            with profile_stage("fingerprint_index"):
+                store_fingerprints(db, user_id, register.id, fingerprints)
+        except Exception as e:
+            db.rollback()
+            print(f"Warning: Failed to index function fingerprints: {e}")
+
+        try:
+            with profile_stage("search_index"):
+                index_functions(db, user_id, register.id, [
+                    dict(detail, file_name=file_name)
+                    for file_name, stats in iter_analyzed_files(results_main, results_sub)
+                    for detail in stats.get("function_details", [])
+                ])
+        except Exception as e:
+            db.rollback()
+            print(f"Warning: Failed to update search index: {e}")
+
+        with profile_stage("render"):
+            return templates.TemplateResponse("results.html", {
+                "request": request,
+                "results_main": results_main,
+                "results_sub": results_sub,
+                "files_list": files_list,
+                "upload_errors": errors,
+                "hotspots": hotspots,
+                "project_name": project_name,
+                "username": username,
+                "user_id": user_id,
+                "project_id": register.id
+            })
     
     except Exception as e:
         db.rollback()
@@ -506,6 +513,154 @@ async def analyze(
             "user_id": user_id
         })
 
+@app.post('/uploads')
+def create_upload_session(
+    filenames: List[str] = Form(...),
+    sizes: List[int] = Form(...),
+    project_name: str = Form(...),
+    username: str = Form('User'),
+    user_id: int = Form(None),
+    chunk_size: int = Form(DEFAULT_CHUNK_SIZE)
+):
+    """
+    Start a resumable upload: declare files and sizes, then PUT their chunks
+    Files are validated once here, not again on finalize
+    """
+    if len(filenames) != len(sizes):
+        raise HTTPException(status_code=400, detail="filenames and sizes must have the same length")
+
+    files, errors = [], []
+    for filename, size in zip(filenames, sizes):
+        valid, result = validate_file(filename)
+        if not valid:
+            errors.append(f"{filename}: {result}")
+        elif size > MAX_FILE_SIZE:
+            errors.append(f"{filename}: Too large (max {MAX_FILE_SIZE} bytes)")
+        elif size < 0:
+            errors.append(f"{filename}: Invalid size")
+        else:
+            files.append({"name": result, "size": size})
+
+    if not files:
+        raise HTTPException(status_code=400, detail={"message": "No valid files", "errors": errors})
+
+    try:
+        meta = upload_sessions.create(
+            files, chunk_size,
+            project_name=project_name, username=username, user_id=user_id, upload_errors=errors
+        )
+    except UploadSessionError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    return {
+        "session_id": meta["session_id"],
+        "chunk_size": meta["chunk_size"],
+        "files": meta["files"],
+        "upload_errors": errors
+    }
+
+@app.put('/uploads/{session_id}/files/{file_index}/chunks/{chunk_index}')
+async def upload_chunk(request: Request, session_id: str, file_index: int, chunk_index: int):
+    """Store one chunk; the X-Chunk-SHA256 header must match the body"""
+    try:
+        expected = await asyncio.to_thread(
+            upload_sessions.expected_chunk_size, session_id, file_index, chunk_index
+        )
+    except UploadSessionError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+
+    # Refuse oversized bodies before buffering them; the stream is capped too,
+    # for clients that send no (or a wrong) Content-Length
+    too_large = HTTPException(status_code=413, detail=f"Chunk must be {expected} bytes")
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > expected:
+        raise too_large
+    parts, received = [], 0
+    async for part in request.stream():
+        received += len(part)
+        if received > expected:
+            raise too_large
+        parts.append(part)
+    data = b"".join(parts)
+
+    try:
+        stored = await asyncio.to_thread(
+            upload_sessions.write_chunk, session_id, file_index, chunk_index,
+            data, request.headers.get("x-chunk-sha256", "")
+        )
+    except UploadSessionError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    return {"file_index": file_index, "chunk_index": chunk_index, "already_received": not stored}
+
+@app.get('/uploads/{session_id}')
+def upload_status(session_id: str):
+    """Which chunks have been received, so a resumed client only sends the rest"""
+    try:
+        return upload_sessions.status(session_id)
+    except UploadSessionError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+
+@app.post('/uploads/{session_id}/finalize', response_class=HTMLResponse)
+async def finalize_upload(request: Request, session_id: str, db: Session = Depends(get_db)):
+    """Assemble a complete upload and run it through the normal analysis"""
+    try:
+        meta = await asyncio.to_thread(upload_sessions.load, session_id)
+        status = await asyncio.to_thread(upload_sessions.status, session_id)
+        if not status["complete"]:
+            return JSONResponse(status_code=409, content=status)
+        saved_files = await asyncio.to_thread(upload_sessions.assemble, session_id, UPLOAD_FOLDER)
+    except UploadSessionError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+
+    await asyncio.to_thread(upload_sessions.delete, session_id)
+    with request_profile(request.headers, "/uploads/finalize"):
+        return await run_analysis(
+            request, db, saved_files, meta.get("upload_errors", []),
+            meta["project_name"], meta.get("username", "User"), meta.get("user_id")
+        )
+
+@app.post('/bulk/analyze')
+async def bulk_analyze(
+    files: List[UploadFile] = File(...),
+    projects: List[str] = Form(...),
+    user_id: int = Form(...),
+    username: str = Form('User'),
+    batch_size: int = Form(BULK_BATCH_SIZE),
+    db: Session = Depends(get_db)
+):
+    """
+    Analyze and store many projects in one request
+    projects[i] names the project files[i] belongs to; each project is saved
+    or reported as failed on its own
+    """
+    if len(projects) != len(files):
+        raise HTTPException(status_code=400, detail="projects must name a project for every file")
+    if not 1 <= batch_size <= MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"batch_size must be between 1 and {MAX_BATCH_SIZE}")
+    if not db.query(Authenticate).filter(Authenticate.id == user_id).first():
+        raise HTTPException(status_code=404, detail="User not found")
+
+    grouped: Dict[str, List[UploadFile]] = {}
+    for file, name in zip(files, projects):
+        if not name.strip():
+            raise HTTPException(status_code=400, detail=f"{file.filename}: empty project name")
+        grouped.setdefault(name.strip(), []).append(file)
+
+    batch_dir = os.path.join(UPLOAD_FOLDER, "bulk", uuid.uuid4().hex)
+    try:
+        specs = []
+        for i, (name, group) in enumerate(grouped.items()):
+            paths, errors = await save_uploaded_files(group, os.path.join(batch_dir, str(i)))
+            specs.append({"project_name": name, "paths": paths, "upload_errors": errors})
+        report = await asyncio.to_thread(
+            ingest, db, specs, user_id, username, batch_size, pool=shared_pool()
+        )
+    finally:
+        shutil.rmtree(batch_dir, ignore_errors=True)
+
+    if report["saved"]:
+        rendered_pages.invalidate_user(user_id)
+    return report
+
 @app.get('/logout')
 def logout():
     return RedirectResponse(url='/', status_code=303)
@@ -522,6 +677,7 @@ def normalize_project_data(raw):
         "sub_files": [],
         "all_files": raw.get("files_list", {}).get("file_list", []),
         "upload_errors": raw.get("upload_errors", []),
+        "hotspots": raw.get("hotspots", []),
     }
 
     # ---------------- Main File Section ----------------
@@ -546,7 +702,8 @@ def normalize_project_data(raw):
             "database_name": stats.get("database_name", []),
             "time_complexity": stats.get("time_complexity", ""),
             "file_bytes": stats.get("file_bytes", ""),
-            "function_details": stats.get("function_details", [])
+            "function_details": stats.get("function_details", []),
+            "hotspots": stats.get("hotspots", [])
         })
 
     # ---------------- Sub File Section ----------------
@@ -571,15 +728,92 @@ def normalize_project_data(raw):
             "database_name": stats.get("database_name", []),
             "time_complexity": stats.get("time_complexity", ""),
             "file_bytes": stats.get("file_bytes", ""),
-            "function_details": stats.get("function_details", [])
+            "function_details": stats.get("function_details", []),
+            "hotspots": stats.get("hotspots", [])
         })
 
 
     return cleaned
 
+# Part of every ETag so a deploy with a changed template never matches old copies
+FINAL_TEMPLATE_VERSION = int(os.path.getmtime(TEMPLATES_DIR / "final.html"))
+
+def final_page_etag(db: Session, store: int) -> str:
+    """ETag for a user's history page, derived from the latest stored analysis"""
+    latest_project, latest_detail, detail_count = (
+        db.query(func.max(Projects.id), func.max(Details.id), func.count(Details.id))
+        .outerjoin(Details, Details.project_id == Projects.id)
+        .filter(Projects.user_id == store)
+        .one()
+    )
+    return make_etag("final", store, latest_project, latest_detail, detail_count, FINAL_TEMPLATE_VERSION)
+
+def build_final_context(db: Session, store: int) -> Dict:
+    """Template context for final.html with every project of a user"""
+    # Fetch ALL projects for this user (not just the first one)
+    projects = db.query(Projects).filter(Projects.user_id == store).order_by(Projects.id.desc()).all()
+
+    if not projects:
+        return {
+            "table_html": "<p>No data found</p>",
+            "saved": {},
+            "error_message": "No projects found for this user"
+        }
+
+    # Fetch JSON details for ALL projects
+    all_projects = []
+    
+    for project in projects:
+        # Fetch details for each project
+        details = db.query(Details).filter(Details.project_id == project.id).order_by(Details.id.desc()).first()
+        
+        if details and details.data:
+            try:
+                # Parse the JSON data
+                if isinstance(details.data, str):
+                    project_data = json.loads(details.data)
+                elif isinstance(details.data, dict):
+                    project_data = details.data
+                else:
+                    project_data = json.loads(str(details.data))
+                
+                # Normalize the project data
+                normalized = normalize_project_data(project_data)
+                # Ensure project_id and project_name are set
+                normalized['project_id'] = project.id
+                normalized['project_name'] = project.project_name
+                all_projects.append(normalized)
+            except Exception as e:
+                print(f"Error parsing Details.data for project {project.id}: {e}")
+                # Continue to next project even if one fails
+                continue
+
+    if not all_projects:
+        return {
+            "table_html": "<p>No data found</p>",
+            "saved": {},
+            "error_message": "No project data available"
+        }
+
+    # Prepare data for template
+    saved_data = {
+        "projects": all_projects,
+        "total_projects": len(all_projects),
+        "user_id": store
+    }
+
+    return {
+        "table_html": "",
+        "saved": saved_data,
+        "projects": all_projects
+    }
+
 @app.get("/final/{store}", response_class=HTMLResponse)
 async def final_page(request: Request, store: int, db: Session = Depends(get_db)):
-    """Display all projects for a user"""
+    """
+    Display all projects for a user
+    Served with an ETag; unchanged history returns 304 or a cached render
+    """
     try:
         # Validate user_id
         if not store or store <= 0:
@@ -593,76 +827,17 @@ async def final_page(request: Request, store: int, db: Session = Depends(get_db)
                 }
             )
 
-        # Fetch ALL projects for this user (not just the first one)
-        projects = db.query(Projects).filter(Projects.user_id == store).order_by(Projects.id.desc()).all()
-
-        if not projects:
-            return templates.TemplateResponse(
-                "final.html",
-                {
-                    "request": request,
-                    "table_html": "<p>No data found</p>",
-                    "saved": {},
-                    "error_message": "No projects found for this user"
-                }
-            )
-
-        # Fetch JSON details for ALL projects
-        all_projects = []
-        
-        for project in projects:
-            # Fetch details for each project
-            details = db.query(Details).filter(Details.project_id == project.id).order_by(Details.id.desc()).first()
-            
-            if details and details.data:
-                try:
-                    # Parse the JSON data
-                    if isinstance(details.data, str):
-                        project_data = json.loads(details.data)
-                    elif isinstance(details.data, dict):
-                        project_data = details.data
-                    else:
-                        project_data = json.loads(str(details.data))
-                    
-                    # Normalize the project data
-                    normalized = normalize_project_data(project_data)
-                    # Ensure project_id and project_name are set
-                    normalized['project_id'] = project.id
-                    normalized['project_name'] = project.project_name
-                    all_projects.append(normalized)
-                except Exception as e:
-                    print(f"Error parsing Details.data for project {project.id}: {e}")
-                    # Continue to next project even if one fails
-                    continue
-
-        if not all_projects:
-            return templates.TemplateResponse(
-                "final.html",
-                {
-                    "request": request,
-                    "table_html": "<p>No data found</p>",
-                    "saved": {},
-                    "error_message": "No project data available"
-                }
-            )
+        etag = final_page_etag(db, store)
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Accept-Encoding"}
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
 
-        # Prepare data for template
-        saved_data = {
-            "projects": all_projects,
-            "total_projects": len(all_projects),
-            "user_id": store
-        }
+        html = rendered_pages.get(store, etag)
+        if html is None:
+            html = templates.get_template("final.html").render(build_final_context(db, store))
+            rendered_pages.set(store, etag, html)
 
-        # Return template response
-        return templates.TemplateResponse(
-            "final.html",
-            {
-                "request": request,
-                "table_html": "",
-                "saved": saved_data,
-                "projects": all_projects
-            }
-        )
+        return HTMLResponse(html, headers=headers)
 
     except Exception as e:
         import traceback
@@ -672,3 +847,312 @@ async def final_page(request: Request, store: int, db: Session = Depends(get_db)
             f"<h1>Error</h1><pre>{str(e)}</pre>",
             status_code=500
         )
+
+MAX_DUPLICATE_CANDIDATES = 5000
+
+def _fingerprint_summary(fp: FunctionFingerprints) -> Dict:
+    return {
+        "project_id": fp.project_id,
+        "file_name": fp.file_name,
+        "function_name": fp.function_name,
+        "line_start": fp.line_start
+    }
+
+@app.get('/duplicates/{store}')
+def duplicates(store: int, project_id: int = None, threshold: float = 0.8, limit: int = 100, db: Session = Depends(get_db)):
+    """
+    Find duplicate and near-duplicate functions for a user
+    With project_id, only matches involving that project are returned
+    (within the project and against the user's other projects)
+    """
+    if not store or store <= 0:
+        raise HTTPException(status_code=400, detail="Invalid user ID")
+    if not 0.0 < threshold <= 1.0:
+        raise HTTPException(status_code=400, detail="threshold must be in (0, 1]")
+    limit = max(1, min(limit, 1000))
+
+    try:
+        # Exact duplicates: identical normalized AST hash
+        project_hashes = (
+            db.query(FunctionFingerprints.exact_hash)
+            .filter(FunctionFingerprints.project_id == project_id)
+        )
+        groups = (
+            db.query(FunctionFingerprints.exact_hash)
+            .filter(FunctionFingerprints.user_id == store)
+            .group_by(FunctionFingerprints.exact_hash)
+            .having(func.count(FunctionFingerprints.id) > 1)
+            .order_by(func.count(FunctionFingerprints.id).desc(), FunctionFingerprints.exact_hash)
+        )
+        if project_id:
+            groups = groups.filter(FunctionFingerprints.exact_hash.in_(project_hashes))
+        duplicate_hashes = [row[0] for row in groups.limit(limit).all()]
+
+        exact = {}
+        if duplicate_hashes:
+            members = (
+                db.query(FunctionFingerprints)
+                .filter(FunctionFingerprints.user_id == store,
+                        FunctionFingerprints.exact_hash.in_(duplicate_hashes))
+                .order_by(FunctionFingerprints.id)
+                .all()
+            )
+            for fp in members:
+                exact.setdefault(fp.exact_hash, []).append(_fingerprint_summary(fp))
+
+        # Near duplicates: candidate pairs share at least one LSH bucket. Same-hash
+        # pairs share every bucket, so they are excluded in SQL before the cap,
+        # and the pairs sharing the most buckets are kept when it is reached
+        band_a = aliased(FingerprintBands)
+        band_b = aliased(FingerprintBands)
+        fp_a = aliased(FunctionFingerprints)
+        fp_b = aliased(FunctionFingerprints)
+        shared_bands = func.count(band_a.id)
+        candidates = (
+            db.query(band_a.fingerprint_id, band_b.fingerprint_id)
+            .join(band_b, and_(
+                band_b.user_id == band_a.user_id,
+                band_b.band_key == band_a.band_key,
+                band_b.fingerprint_id != band_a.fingerprint_id
+            ))
+            .join(fp_a, fp_a.id == band_a.fingerprint_id)
+            .join(fp_b, fp_b.id == band_b.fingerprint_id)
+            .filter(band_a.user_id == store, fp_a.exact_hash != fp_b.exact_hash)
+        )
+        if project_id:
+            candidates = candidates.filter(fp_a.project_id == project_id)
+        else:
+            candidates = candidates.filter(band_a.fingerprint_id < band_b.fingerprint_id)
+
+        rows = (
+            candidates
+            .group_by(band_a.fingerprint_id, band_b.fingerprint_id)
+            .order_by(shared_bands.desc(), band_a.fingerprint_id, band_b.fingerprint_id)
+            .limit(MAX_DUPLICATE_CANDIDATES + 1)
+            .all()
+        )
+        candidates_truncated = len(rows) > MAX_DUPLICATE_CANDIDATES
+        pairs = list(dict.fromkeys(tuple(sorted(pair)) for pair in rows[:MAX_DUPLICATE_CANDIDATES]))
+        ids = {fid for pair in pairs for fid in pair}
+        by_id = {}
+        if ids:
+            by_id = {
+                fp.id: fp for fp in
+                db.query(FunctionFingerprints).filter(FunctionFingerprints.id.in_(ids)).all()
+            }
+
+        near = []
+        for id_a, id_b in pairs:
+            fp_a, fp_b = by_id.get(id_a), by_id.get(id_b)
+            if not fp_a or not fp_b:
+                continue
+            similarity = estimate_similarity(fp_a.minhash, fp_b.minhash)
+            if similarity >= threshold:
+                near.append({
+                    "similarity": round(similarity, 3),
+                    "a": _fingerprint_summary(fp_a),
+                    "b": _fingerprint_summary(fp_b)
+                })
+        near.sort(key=lambda item: item["similarity"], reverse=True)
+
+        return {
+            "user_id": store,
+            "project_id": project_id,
+            "exact_duplicates": [
+                {"fingerprint": h, "functions": fns} for h, fns in exact.items()
+            ],
+            "near_duplicates": near[:limit],
+            # True when more than MAX_DUPLICATE_CANDIDATES bucket pairs matched;
+            # only the pairs sharing the most buckets were compared
+            "candidates_truncated": candidates_truncated
+        }
+    except Exception as e:
+        print(f"Duplicate lookup error: {e}")
+        raise HTTPException(status_code=500, detail=f"Duplicate lookup failed: {str(e)}")
+
+@app.get('/search')
+def search(q: str, user_id: int = None, project_id: int = None, page: int = 1, page_size: int = 20, db: Session = Depends(get_db)):
+    """
+    Full-text search over function names, args, docstrings and file names
+    Terms are ANDed; append '*' to a term for a prefix match (e.g. ?q=calc*)
+    """
+    if not q or not q.strip():
+        raise HTTPException(status_code=400, detail="Query cannot be empty")
+    try:
+        return search_functions(db, q, user_id=user_id, project_id=project_id, page=page, page_size=page_size)
+    except Exception as e:
+        print(f"Search error: {e}")
+        raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
+
+EXPORT_BATCH_SIZE = 200
+EXPORT_CSV_FIELDS = [
+    "record_type", "project_id", "project_name", "detail_id", "files", "file_name", "role",
+    "function_name", "args", "line_start", "line_end", "fingerprint", "docstring",
+    "is_async", "cyclomatic", "max_nesting", "loc", "function_loops", "recursive",
+    "lines", "functions", "classes", "variables", "imports", "loops",
+    "complexity", "time_complexity", "file_bytes", "database_calls", "database_name", "upload_errors"
+]
+
+def iter_export_records(store: int):
+    """
+    Yield project, file and function records for every stored analysis of a user
+    Rows are streamed from a server-side cursor, one Details row at a time
+    """
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(Details.id, Details.data, Projects.id, Projects.project_name)
+            .join(Projects, Details.project_id == Projects.id)
+            .filter(Projects.user_id == store)
+            .order_by(Projects.id, Details.id)
+            .yield_per(EXPORT_BATCH_SIZE)
+        )
+        for detail_id, data, project_id, project_name in rows:
+            try:
+                raw = json.loads(data) if isinstance(data, str) else (data or {})
+                project = normalize_project_data(raw)
+            except Exception as e:
+                print(f"Export: skipping Details {detail_id}: {e}")
+                continue
+
+            base = {"project_id": project_id, "project_name": project_name, "detail_id": detail_id}
+            yield dict(base, record_type="project",
+                       files=len(project["all_files"]),
+                       upload_errors=project["upload_errors"])
+
+            for role, files in (("main", project["main_files"]), ("sub", project["sub_files"])):
+                for file in files:
+                    function_details = file.pop("function_details", [])
+                    file.pop("hotspots", None)
+                    yield dict(base, record_type="file", role=role, **file)
+                    for fn in function_details:
+                        yield {
+                            **base,
+                            "record_type": "function",
+                            "file_name": file["file_name"],
+                            "role": role,
+                            "function_name": fn.get("qualname", fn.get("name")),
+                            "args": fn.get("args", []),
+                            "line_start": fn.get("line_start"),
+                            "line_end": fn.get("line_end"),
+                            "fingerprint": fn.get("fingerprint"),
+                            "is_async": fn.get("is_async"),
+                            "cyclomatic": fn.get("cyclomatic"),
+                            "max_nesting": fn.get("max_nesting"),
+                            "loc": fn.get("loc"),
+                            "function_loops": fn.get("loops"),
+                            "recursive": fn.get("recursive"),
+                            "docstring": fn.get("docstring", "")
+                        }
+    finally:
+        db.close()
+
+def _export_ndjson(records):
+    for record in records:
+        yield json.dumps(record, default=str) + "\n"
+
+def _export_csv(records):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_CSV_FIELDS, extrasaction="ignore")
+    writer.writeheader()
+    for record in records:
+        writer.writerow({
+            key: ";".join(map(str, value)) if isinstance(value, list) else value
+            for key, value in record.items()
+        })
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+@app.get('/export/{store}')
+def export_history(store: int, format: str = "ndjson"):
+    """Stream a user's full analysis history as NDJSON or CSV"""
+    if not store or store <= 0:
+        raise HTTPException(status_code=400, detail="Invalid user ID")
+    if format == "ndjson":
+        body, media_type = _export_ndjson(iter_export_records(store)), "application/x-ndjson"
+    elif format == "csv":
+        body, media_type = _export_csv(iter_export_records(store)), "text/csv"
+    else:
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'csv'")
+
+    # The generator owns its session: Depends(get_db) closes before streaming starts
+    return StreamingResponse(body, media_type=media_type, headers={
+        "Content-Disposition": f'attachment; filename="analysis_{store}.{format}"'
+    })
+
+@app.get('/metrics/{store}')
+def metrics_summary(store: int, db: Session = Depends(get_db)):
+    """Aggregate metrics across all of a user's projects"""
+    if not store or store <= 0:
+        raise HTTPException(status_code=400, detail="Invalid user ID")
+    try:
+        return user_summary(db, store)
+    except Exception as e:
+        print(f"Metrics error: {e}")
+        raise HTTPException(status_code=500, detail=f"Metrics failed: {str(e)}")
+
+@app.get('/metrics/{store}/trends')
+def metrics_trends(store: int, project_name: str = None, db: Session = Depends(get_db)):
+    """Per-version totals for a user's projects, oldest first"""
+    if not store or store <= 0:
+        raise HTTPException(status_code=400, detail="Invalid user ID")
+    try:
+        return project_trends(db, store, project_name)
+    except Exception as e:
+        print(f"Metrics error: {e}")
+        raise HTTPException(status_code=500, detail=f"Metrics failed: {str(e)}")
+
+@app.get('/metrics/{store}/projects/{project_id}')
+def metrics_project(store: int, project_id: int, db: Session = Depends(get_db)):
+    """Aggregate metrics for a single project"""
+    if not store or store <= 0:
+        raise HTTPException(status_code=400, detail="Invalid user ID")
+    try:
+        summary = project_summary(db, store, project_id)
+    except Exception as e:
+        print(f"Metrics error: {e}")
+        raise HTTPException(status_code=500, detail=f"Metrics failed: {str(e)}")
+    if summary is None:
+        raise HTTPException(status_code=404, detail="No metrics for this project")
+    return summary
+
+@app.get('/projects/{project_id}/hotspots')
+def hotspots(project_id: int, db: Session = Depends(get_db)):
+    """
+    Precomputed worst functions of a project
+    Only the hotspot list is read from Details.data, not the whole payload
+    """
+    try:
+        row = (
+            db.query(Details.data["hotspots"])
+            .filter(Details.project_id == project_id)
+            .order_by(Details.id.desc())
+            .first()
+        )
+    except Exception as e:
+        print(f"Hotspots error: {e}")
+        raise HTTPException(status_code=500, detail=f"Hotspots failed: {str(e)}")
+    if row is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+    return {"project_id": project_id, "hotspots": row[0] or []}
+
+@app.get('/profiles')
+def profiles(limit: int = 50):
+    """Recent request profiles with their top stage, allocator and hottest function"""
+    if not profiling.PROFILE_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    return {"profiles": profiling.list_profiles(max(1, min(limit, 500)))}
+
+@app.get('/profiles/{profile_id}')
+def profile_detail(profile_id: str):
+    """Full summary of one profile: stages, top allocators and hottest functions"""
+    if not profiling.PROFILE_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    summary = profiling.load_profile(profile_id)
+    if summary is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return summary
+
+STARTUP_TIMINGS["import_seconds"] = round(time.perf_counter() - _import_started, 4)
@@ -1,8 +1,11 @@
 from database import Base
-from sqlalchemy import Column, Integer, String, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, ForeignKey, Text, Index, JSON, DateTime, func
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import JSONB
 
+# JSONB on Postgres, plain JSON elsewhere (SQLite for local runs)
+JSONType = JSON().with_variant(JSONB(), "postgresql")
+
 
 class Authenticate(Base):
     __tablename__ = "authenticate"
@@ -53,6 +56,129 @@ class Details(Base):
         index=True
     )
 
-    data = Column(JSONB, nullable=True)
+    data = Column(JSONType, nullable=True)
+
+    project = relationship("Projects", back_populates="details")
+
+
+class FunctionFingerprints(Base):
+    __tablename__ = "function_fingerprints"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    user_id = Column(
+        Integer,
+        ForeignKey("authenticate.id", ondelete="CASCADE"),
+        nullable=False
+    )
+
+    project_id = Column(
+        Integer,
+        ForeignKey("projects.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True
+    )
+
+    file_name = Column(String, nullable=False)
+    function_name = Column(String, nullable=False)
+    line_start = Column(Integer, nullable=True)
+
+    exact_hash = Column(String(64), nullable=False)
+    minhash = Column(JSONType, nullable=False)
+
+    bands = relationship(
+        "FingerprintBands",
+        back_populates="fingerprint",
+        cascade="all, delete-orphan"
+    )
+
+    __table_args__ = (
+        Index("ix_function_fingerprints_user_hash", "user_id", "exact_hash"),
+    )
+
+
+class FingerprintBands(Base):
+    __tablename__ = "fingerprint_bands"
+
+    id = Column(Integer, primary_key=True)
+
+    fingerprint_id = Column(
+        Integer,
+        ForeignKey("function_fingerprints.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True
+    )
+
+    # Denormalized so bucket lookups never leave the index
+    user_id = Column(Integer, nullable=False)
+    band_key = Column(String, nullable=False)
+
+    fingerprint = relationship("FunctionFingerprints", back_populates="bands")
+
+    __table_args__ = (
+        Index("ix_fingerprint_bands_user_key", "user_id", "band_key"),
+    )
+
+
+class FileMetrics(Base):
+    __tablename__ = "file_metrics"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    user_id = Column(
+        Integer,
+        ForeignKey("authenticate.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True
+    )
+
+    project_id = Column(
+        Integer,
+        ForeignKey("projects.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True
+    )
+
+    detail_id = Column(
+        Integer,
+        ForeignKey("details.id", ondelete="CASCADE"),
+        nullable=True
+    )
+
+    file_name = Column(String, nullable=False)
+    role = Column(String(8), nullable=False)  # "main" or "sub"
+
+    lines = Column(Integer, nullable=False, default=0)
+    functions = Column(Integer, nullable=False, default=0)
+    classes = Column(Integer, nullable=False, default=0)
+    variables = Column(Integer, nullable=False, default=0)
+    imports = Column(Integer, nullable=False, default=0)
+    loops = Column(Integer, nullable=False, default=0)
+    time_complexity = Column(String, nullable=True)
+
+    created_at = Column(DateTime, nullable=False, server_default=func.now())
+
+    drivers = relationship(
+        "FileDrivers",
+        back_populates="file_metric",
+        cascade="all, delete-orphan"
+    )
+
+
+class FileDrivers(Base):
+    __tablename__ = "file_drivers"
+
+    id = Column(Integer, primary_key=True)
+
+    file_metric_id = Column(
+        Integer,
+        ForeignKey("file_metrics.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True
+    )
+
+    user_id = Column(Integer, nullable=False, index=True)
+    project_id = Column(Integer, nullable=False, index=True)
+    driver = Column(String, nullable=False)
 
-    project = relationship("Projects", back_populates="details")
\ No newline at end of file
+    file_metric = relationship("FileMetrics", back_populates="drivers")
@@ -0,0 +1,133 @@
+import ast
+import copy
+import hashlib
+import random
+from typing import Dict, Iterable, List, Tuple
+
+# MinHash / LSH parameters. 64 permutations split into 16 bands of 4 rows
+# puts the LSH similarity threshold at roughly (1/16) ** (1/4) ~= 0.5.
+NUM_PERM = 64
+LSH_BANDS = 16
+LSH_ROWS = NUM_PERM // LSH_BANDS
+SHINGLE_SIZE = 5
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+# Fixed seed so signatures stay comparable across processes and restarts
+_rng = random.Random(20240611)
+_PERMUTATIONS = [
+    (_rng.randint(1, _MERSENNE_PRIME - 1), _rng.randint(0, _MERSENNE_PRIME - 1))
+    for _ in range(NUM_PERM)
+]
+
+
+class _Normalizer(ast.NodeTransformer):
+    """Abstract identifiers and constants so renamed copies hash the same"""
+
+    def __init__(self):
+        self.names: Dict[str, str] = {}
+
+    def _alias(self, name: str) -> str:
+        if name not in self.names:
+            self.names[name] = f"v{len(self.names)}"
+        return self.names[name]
+
+    def _strip_docstring(self, node):
+        body = node.body
+        if (body and isinstance(body[0], ast.Expr)
+                and isinstance(body[0].value, ast.Constant)
+                and isinstance(body[0].value.value, str)):
+            node.body = body[1:] or [ast.Pass()]
+
+    def visit_FunctionDef(self, node):
+        self._strip_docstring(node)
+        node.name = self._alias(node.name)
+        node.returns = None
+        return self.generic_visit(node)
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_ClassDef(self, node):
+        self._strip_docstring(node)
+        node.name = self._alias(node.name)
+        return self.generic_visit(node)
+
+    def visit_arg(self, node):
+        node.arg = self._alias(node.arg)
+        node.annotation = None
+        return node
+
+    def visit_Name(self, node):
+        node.id = self._alias(node.id)
+        return node
+
+    def visit_Constant(self, node):
+        return ast.Constant(value=type(node.value).__name__)
+
+
+def _tokens(node: ast.AST) -> Iterable[str]:
+    """Pre-order token stream of a normalized tree"""
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        if isinstance(current, ast.Name):
+            yield current.id
+        elif isinstance(current, ast.Constant):
+            yield f"const:{current.value}"
+        elif isinstance(current, ast.Attribute):
+            yield f"attr:{current.attr}"
+        else:
+            yield type(current).__name__
+        stack.extend(reversed(list(ast.iter_child_nodes(current))))
+
+
+def _hash32(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=4).digest(), "big")
+
+
+def minhash_signature(tokens: List[str]) -> List[int]:
+    """MinHash signature over k-token shingles"""
+    if len(tokens) < SHINGLE_SIZE:
+        shingles = {" ".join(tokens)}
+    else:
+        shingles = {
+            " ".join(tokens[i:i + SHINGLE_SIZE])
+            for i in range(len(tokens) - SHINGLE_SIZE + 1)
+        }
+    hashed = [_hash32(s) for s in shingles]
+
+    signature = []
+    for a, b in _PERMUTATIONS:
+        signature.append(min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashed))
+    return signature
+
+
+def lsh_band_keys(signature: List[int]) -> List[str]:
+    """Bucket keys for each LSH band; two functions sharing any key are candidates"""
+    keys = []
+    for band in range(LSH_BANDS):
+        rows = signature[band * LSH_ROWS:(band + 1) * LSH_ROWS]
+        digest = hashlib.blake2b(
+            ",".join(str(r) for r in rows).encode("ascii"), digest_size=8
+        ).hexdigest()
+        keys.append(f"{band}:{digest}")
+    return keys
+
+
+def estimate_similarity(sig_a: List[int], sig_b: List[int]) -> float:
+    """Estimated Jaccard similarity of two MinHash signatures"""
+    if not sig_a or len(sig_a) != len(sig_b):
+        return 0.0
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / len(sig_a)
+
+
+def fingerprint_function(node: ast.AST) -> Tuple[str, List[int]]:
+    """
+    Fingerprint a function node
+    Returns the exact hash of its normalized AST and its MinHash signature
+    """
+    normalized = _Normalizer().visit(copy.deepcopy(node))
+    dump = ast.dump(normalized, annotate_fields=False, include_attributes=False)
+    exact_hash = hashlib.sha256(dump.encode("utf-8")).hexdigest()
+    return exact_hash, minhash_signature(list(_tokens(normalized)))
@@ -0,0 +1,43 @@
+"""
+Production entry point: gunicorn -c gunicorn.conf.py
+
+The app is imported once in the master (preload_app) and pre-warmed there,
+the schema is created once before workers fork, and each worker only opens
+its own DB connections.
+"""
+import os
+import time
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn_worker.UvicornWorker"
+wsgi_app = "demo:app"
+preload_app = True
+
+# Workers inherit this and skip create_all in their startup hook
+os.environ["SKIP_DB_INIT"] = "1"
+
+
+def on_starting(server):
+    from database import engine
+    from init_db import init_database
+    import demo
+
+    started = time.perf_counter()
+    try:
+        init_database()
+        server.log.info("Database initialized in %.3fs", time.perf_counter() - started)
+    except Exception as e:
+        server.log.warning("Database initialization failed (non-critical): %s", e)
+    demo.prewarm()
+    server.log.info("Startup timings: %s", demo.STARTUP_TIMINGS)
+
+    # Connections opened in the master must not be shared with forked workers
+    engine.dispose()
+
+
+def post_fork(server, worker):
+    from database import engine
+
+    # Drop any pooled connections inherited from the master without closing them
+    engine.dispose(close=False)
@@ -0,0 +1,19 @@
+"""
+Create the database schema and search index
+
+Run once per deploy (`python init_db.py`) or let gunicorn.conf.py do it in
+the master process, instead of every worker racing through create_all.
+"""
+from database import engine, Base
+import dynamic  # noqa: F401  (registers the models on Base.metadata)
+from search import ensure_search_index
+
+
+def init_database():
+    Base.metadata.create_all(bind=engine)
+    ensure_search_index(engine)
+
+
+if __name__ == "__main__":
+    init_database()
+    print("✓ Database initialized")
@@ -0,0 +1,489 @@
+"""
+Load-testing harness
+
+Starts the app locally (uvicorn, SQLite by default) in a throwaway working
+directory, drives a weighted mix of /authenticate, /analyze (multi-file
+uploads from a synthetic corpus) and /final/{store}, then reports
+throughput, p50/p95/p99 latency and error rate per endpoint plus worker
+RSS. Exits non-zero when any SLO threshold is missed.
+
+    python loadtest.py --duration 60 --concurrency 16 --workers 2 \\
+        --mix authenticate=1,analyze=2,final=4 \\
+        --slo analyze.p95=1500 --slo final.p99=800 --slo error_rate=0.01 --slo rss_mb=400
+
+Use --database-url postgresql://... for a local Postgres stand-in, or
+--base-url to target a server that is already running (RSS is then not
+sampled).
+"""
+import argparse
+import json
+import math
+import os
+import random
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+ENDPOINTS = ("authenticate", "analyze", "final")
+DEFAULT_MIX = "authenticate=1,analyze=2,final=4"
+# Only results.html renders this; analysis errors come back as index.html with HTTP 200
+RESULTS_MARKER = b"<title>Analysis Results"
+PASSWORD = "loadtest-password"
+
+
+# ---------------- Synthetic corpus ----------------
+
+def synthetic_module(rng: random.Random, index: int) -> str:
+    """A Python module with a realistic spread of functions, loops, classes and DB calls"""
+    lines = ["import os", "import json", ""]
+    if rng.random() < 0.3:
+        lines += ["import sqlite3", f"conn = sqlite3.connect('db_{index}.sqlite')", ""]
+    for c in range(rng.randint(0, 2)):
+        lines.append(f"class Model{index}_{c}:")
+        for m in range(rng.randint(1, 4)):
+            lines += [
+                f"    def method_{m}(self, items, limit={m}):",
+                f"        \"\"\"Method {m} of model {c}\"\"\"",
+                "        total = 0",
+                "        for item in items:",
+                "            if item > limit and item % 2:",
+                "                total += item",
+                "        return total",
+                "",
+            ]
+    for f in range(rng.randint(3, 25)):
+        depth = rng.randint(0, 3)
+        lines += [f"def func_{index}_{f}(data, threshold={f}):", f"    \"\"\"Process batch {f}\"\"\"", "    result = []"]
+        indent = "    "
+        for d in range(depth):
+            lines.append(f"{indent}for x{d} in data:")
+            indent += "    "
+        lines += [
+            f"{indent}if threshold > {f} or not data:",
+            f"{indent}    result.append(json.dumps({{'v': threshold}}))",
+            "    return result",
+            "",
+        ]
+    if rng.random() < 0.5:
+        lines += ["if __name__ == '__main__':", f"    print(func_{index}_0([1, 2, 3]))", ""]
+    return "\n".join(lines)
+
+
+def build_corpus(size: int, seed: int) -> List[Tuple[str, bytes]]:
+    rng = random.Random(seed)
+    return [(f"module_{i}.py", synthetic_module(rng, i).encode("utf-8")) for i in range(size)]
+
+
+# ---------------- HTTP ----------------
+
+def encode_multipart(fields: Dict[str, str], files: List[Tuple[str, str, bytes]]) -> Tuple[bytes, str]:
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(
+            f"--{boundary}\r\nContent-Disposition: form-data; name=\"{name}\"\r\n\r\n{value}\r\n".encode()
+        )
+    for name, filename, content in files:
+        parts.append(
+            f"--{boundary}\r\nContent-Disposition: form-data; name=\"{name}\"; filename=\"{filename}\"\r\n"
+            f"Content-Type: text/x-python\r\n\r\n".encode() + content + b"\r\n"
+        )
+    parts.append(f"--{boundary}--\r\n".encode())
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+def fetch(method: str, url: str, body: Optional[bytes] = None,
+          headers: Optional[Dict[str, str]] = None, timeout: float = 60) -> Tuple[int, bytes, Dict[str, str]]:
+    """Returns (status, body, lower-cased response headers)"""
+    req = urllib.request.Request(url, data=body, method=method, headers=headers or {})
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            return resp.status, resp.read(), {k.lower(): v for k, v in resp.headers.items()}
+    except urllib.error.HTTPError as e:
+        return e.code, e.read(), {k.lower(): v for k, v in e.headers.items()}
+
+
+def request(method: str, url: str, body: Optional[bytes] = None,
+            headers: Optional[Dict[str, str]] = None, timeout: float = 60) -> Tuple[int, bytes]:
+    status, content, _ = fetch(method, url, body, headers, timeout)
+    return status, content
+
+
+def post_form(url: str, fields: Dict[str, str]) -> Tuple[int, bytes]:
+    body = urllib.parse.urlencode(fields).encode()
+    return request("POST", url, body, {"Content-Type": "application/x-www-form-urlencoded"})
+
+
+# ---------------- Local server ----------------
+
+class LocalServer:
+    """uvicorn running demo:app from a scratch directory so uploads/ never touch the repo"""
+
+    def __init__(self, port: int, workers: int, database_url: Optional[str]):
+        self.port = port
+        self.workers = workers
+        self.workdir = tempfile.mkdtemp(prefix="loadtest-")
+        self.database_url = database_url or f"sqlite:///{os.path.join(self.workdir, 'loadtest.db')}"
+        self.process: Optional[subprocess.Popen] = None
+        self.log_path = os.path.join(self.workdir, "server.log")
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self, timeout: float = 60):
+        env = dict(os.environ, DATABASE_URL=self.database_url,
+                   PYTHONPATH=REPO_DIR + os.pathsep + os.environ.get("PYTHONPATH", ""))
+        log = open(self.log_path, "w")
+        # Create the schema once here; workers would otherwise race on it
+        subprocess.run([sys.executable, os.path.join(REPO_DIR, "init_db.py")], cwd=self.workdir,
+                       env=env, stdout=log, stderr=subprocess.STDOUT, check=True)
+        cmd = [sys.executable, "-m", "uvicorn", "demo:app", "--host", "127.0.0.1",
+               "--port", str(self.port), "--workers", str(self.workers), "--log-level", "warning"]
+        self.process = subprocess.Popen(cmd, cwd=self.workdir, env=dict(env, SKIP_DB_INIT="1"),
+                                        stdout=log, stderr=subprocess.STDOUT)
+
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"Server exited early, see {self.log_path}")
+            try:
+                status, _ = request("GET", f"{self.base_url}/health", timeout=2)
+                if status == 200:
+                    return
+            except OSError:
+                pass
+            time.sleep(0.25)
+        raise RuntimeError(f"Server did not become healthy within {timeout}s, see {self.log_path}")
+
+    def stop(self):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def pids(self) -> List[int]:
+        """Server process and its worker children (Linux /proc)"""
+        if not self.process:
+            return []
+        pids, frontier = [], [self.process.pid]
+        while frontier:
+            pid = frontier.pop()
+            pids.append(pid)
+            try:
+                for task in os.listdir(f"/proc/{pid}/task"):
+                    with open(f"/proc/{pid}/task/{task}/children") as fh:
+                        frontier.extend(int(c) for c in fh.read().split())
+            except OSError:
+                continue
+        return pids
+
+
+def rss_bytes(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/status") as fh:
+            for line in fh:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+class RssSampler(threading.Thread):
+    def __init__(self, server: LocalServer, interval: float = 0.5):
+        super().__init__(daemon=True)
+        self.server = server
+        self.interval = interval
+        self.peak_per_process: Dict[int, int] = {}
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            for pid in self.server.pids():
+                self.peak_per_process[pid] = max(self.peak_per_process.get(pid, 0), rss_bytes(pid))
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+# ---------------- Load generation ----------------
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.not_modified: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint: str, seconds: float, ok: bool, not_modified: bool = False):
+        with self._lock:
+            self.latencies.setdefault(endpoint, []).append(seconds)
+            if not ok:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+            if not_modified:
+                self.not_modified[endpoint] = self.not_modified.get(endpoint, 0) + 1
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint in mix: {name}")
+        weights[name.strip()] = float(weight or 1)
+    return weights
+
+
+def setup_users(base_url: str, count: int) -> List[Tuple[str, int]]:
+    users = []
+    run_id = uuid.uuid4().hex[:6]
+    for i in range(count):
+        name = f"load_{run_id}_{i}"
+        post_form(f"{base_url}/register", {"name": name, "password": PASSWORD})
+        status, body = post_form(f"{base_url}/authenticate", {"name": name, "password": PASSWORD})
+        match = re.search(rb'name="user_id" value="(\d+)"', body)
+        if status != 200 or not match:
+            raise RuntimeError(f"Could not create load-test user {name} (HTTP {status})")
+        users.append((name, int(match.group(1))))
+    return users
+
+
+def run_load(base_url: str, users: List[Tuple[str, int]], corpus: List[Tuple[str, bytes]],
+             weights: Dict[str, float], duration: float, concurrency: int,
+             files_per_upload: int, seed: int, revalidate: float) -> Tuple[Recorder, float]:
+    recorder = Recorder()
+    endpoints, endpoint_weights = zip(*weights.items())
+    deadline = time.perf_counter() + duration
+
+    def worker(worker_id: int):
+        rng = random.Random(seed + worker_id)
+        etags: Dict[int, str] = {}  # last /final ETag this client saw, per user
+        while time.perf_counter() < deadline:
+            endpoint = rng.choices(endpoints, endpoint_weights)[0]
+            name, user_id = rng.choice(users)
+            started = time.perf_counter()
+            not_modified = False
+            try:
+                if endpoint == "authenticate":
+                    status, body = post_form(f"{base_url}/authenticate", {"name": name, "password": PASSWORD})
+                    ok = status == 200 and b'name="user_id"' in body
+                elif endpoint == "analyze":
+                    files = [
+                        ("files", filename, content)
+                        for filename, content in rng.sample(corpus, min(files_per_upload, len(corpus)))
+                    ]
+                    body, content_type = encode_multipart({
+                        "project_name": f"load_{rng.randint(0, 20)}",
+                        "username": name,
+                        "user_id": str(user_id),
+                    }, files)
+                    status, body = request("POST", f"{base_url}/analyze", body, {"Content-Type": content_type})
+                    # Failures re-render index.html with HTTP 200, so check for the results page
+                    ok = status == 200 and RESULTS_MARKER in body
+                else:
+                    headers = {}
+                    if user_id in etags and rng.random() < revalidate:
+                        headers["If-None-Match"] = etags[user_id]
+                    status, _, response_headers = fetch("GET", f"{base_url}/final/{user_id}", headers=headers)
+                    not_modified = status == 304
+                    ok = status == 200 or (not_modified and bool(headers))
+                    if status == 200 and "etag" in response_headers:
+                        etags[user_id] = response_headers["etag"]
+            except Exception:
+                ok = False
+            recorder.record(endpoint, time.perf_counter() - started, ok, not_modified)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for i in range(concurrency):
+            pool.submit(worker, i)
+    return recorder, time.perf_counter() - started
+
+
+# ---------------- Reporting ----------------
+
+def build_report(recorder: Recorder, elapsed: float, rss: Optional[Dict[int, int]]) -> Dict:
+    endpoints = {}
+    total_requests = total_errors = 0
+    for endpoint, latencies in sorted(recorder.latencies.items()):
+        values = sorted(latencies)
+        errors = recorder.errors.get(endpoint, 0)
+        total_requests += len(values)
+        total_errors += errors
+        endpoints[endpoint] = {
+            "requests": len(values),
+            "throughput_rps": round(len(values) / elapsed, 2),
+            "error_rate": round(errors / len(values), 4),
+            "p50_ms": round(percentile(values, 50) * 1000, 1),
+            "p95_ms": round(percentile(values, 95) * 1000, 1),
+            "p99_ms": round(percentile(values, 99) * 1000, 1),
+            "max_ms": round(values[-1] * 1000, 1),
+            "not_modified": recorder.not_modified.get(endpoint, 0),
+        }
+    report = {
+        "elapsed_seconds": round(elapsed, 2),
+        "requests": total_requests,
+        "throughput_rps": round(total_requests / elapsed, 2) if elapsed else 0.0,
+        "error_rate": round(total_errors / total_requests, 4) if total_requests else 0.0,
+        "endpoints": endpoints,
+    }
+    if rss is not None:
+        report["rss_mb"] = {str(pid): round(b / (1024 * 1024), 1) for pid, b in sorted(rss.items())}
+        report["max_rss_mb"] = max(report["rss_mb"].values(), default=0.0)
+    return report
+
+
+ENDPOINT_METRICS = {"p50": "p50_ms", "p95": "p95_ms", "p99": "p99_ms", "max": "max_ms",
+                    "error_rate": "error_rate", "throughput_rps": "throughput_rps"}
+OVERALL_METRICS = {"error_rate": "error_rate", "throughput_rps": "throughput_rps", "rss_mb": "max_rss_mb"}
+
+
+def parse_slos(slos: List[str]) -> List[Tuple[str, str, str, float]]:
+    """
+    Thresholds look like `analyze.p95=800` (ms), `final.error_rate=0.01`,
+    `error_rate=0.02` (overall), `throughput_rps=20` (minimum) or `rss_mb=512`
+    (peak RSS of any server process). Returns (key, endpoint, metric, limit).
+    """
+    parsed = []
+    for slo in slos:
+        key, _, raw = slo.partition("=")
+        endpoint, _, metric = key.strip().rpartition(".")
+        try:
+            limit = float(raw)
+        except ValueError:
+            raise ValueError(f"SLO {slo!r} needs a numeric threshold, e.g. analyze.p95=800")
+        if endpoint and endpoint not in ENDPOINTS:
+            raise ValueError(f"SLO {slo!r}: unknown endpoint {endpoint!r}")
+        if metric not in (ENDPOINT_METRICS if endpoint else OVERALL_METRICS):
+            raise ValueError(f"SLO {slo!r}: unknown metric {metric!r}")
+        parsed.append((key.strip(), endpoint, metric, limit))
+    return parsed
+
+
+def check_slos(report: Dict, slos: List[Tuple[str, str, str, float]]) -> List[str]:
+    """Compare a report with parse_slos() output; returns the violations"""
+    violations = []
+    for key, endpoint, metric, limit in slos:
+        if endpoint:
+            stats = report["endpoints"].get(endpoint)
+            if stats is None:
+                violations.append(f"{key}: no requests recorded for {endpoint}")
+                continue
+            value = stats[ENDPOINT_METRICS[metric]]
+        else:
+            value = report.get(OVERALL_METRICS[metric])
+            if value is None:
+                violations.append(f"{key}: not measured")
+                continue
+        if metric == "throughput_rps":
+            if value < limit:
+                violations.append(f"{key}: {value} < {limit}")
+        elif value > limit:
+            violations.append(f"{key}: {value} > {limit}")
+    return violations
+
+
+def print_report(report: Dict):
+    print(f"\n{'endpoint':<14}{'reqs':>7}{'rps':>9}{'err%':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}{'304':>6}")
+    for endpoint, s in report["endpoints"].items():
+        print(f"{endpoint:<14}{s['requests']:>7}{s['throughput_rps']:>9}{s['error_rate'] * 100:>7.2f}%"
+              f"{s['p50_ms']:>9}{s['p95_ms']:>9}{s['p99_ms']:>9}{s['max_ms']:>9}{s['not_modified']:>6}")
+    print(f"\nTotal: {report['requests']} requests in {report['elapsed_seconds']}s "
+          f"({report['throughput_rps']} rps), error rate {report['error_rate'] * 100:.2f}%")
+    if "rss_mb" in report:
+        print(f"Peak RSS per process (MB): {report['rss_mb']}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Load test the analyzer and check latency SLOs")
+    parser.add_argument("--base-url", help="Target a running server instead of starting one")
+    parser.add_argument("--database-url", help="Database for the local server (default: SQLite in a temp dir)")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds of load")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent clients")
+    parser.add_argument("--users", type=int, default=4)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Endpoint weights, e.g. " + DEFAULT_MIX)
+    parser.add_argument("--corpus-size", type=int, default=50)
+    parser.add_argument("--files-per-upload", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--revalidate", type=float, default=0.5,
+                        help="Share of /final requests sent with If-None-Match once an ETag is known")
+    parser.add_argument("--slo", action="append", default=[], help="Threshold, repeatable (see parse_slos)")
+    parser.add_argument("--json", help="Also write the report to this path")
+    args = parser.parse_args(argv)
+
+    # Validate everything before minutes of load, not after
+    try:
+        weights = parse_mix(args.mix)
+        slos = parse_slos(args.slo)
+        if not 0.0 <= args.revalidate <= 1.0:
+            raise ValueError("--revalidate must be between 0 and 1")
+    except ValueError as e:
+        parser.error(str(e))
+    corpus = build_corpus(args.corpus_size, args.seed)
+
+    server = None if args.base_url else LocalServer(args.port, args.workers, args.database_url)
+    sampler = None
+    try:
+        if server:
+            server.start()
+            sampler = RssSampler(server)
+            sampler.start()
+        base_url = args.base_url or server.base_url
+
+        users = setup_users(base_url, args.users)
+        print(f"Running {args.duration}s of load against {base_url} "
+              f"({args.concurrency} clients, mix {weights})")
+        recorder, elapsed = run_load(base_url, users, corpus, weights, args.duration,
+                                     args.concurrency, args.files_per_upload, args.seed, args.revalidate)
+    finally:
+        if sampler:
+            sampler.stop()
+        if server:
+            server.stop()
+
+    report = build_report(recorder, elapsed, sampler.peak_per_process if sampler else None)
+    violations = check_slos(report, slos)
+    report["slo_violations"] = violations
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump(report, fh, indent=2)
+
+    if violations:
+        print("\n✗ SLO violations:")
+        for violation in violations:
+            print(f"  - {violation}")
+        return 1
+    print("\n✓ All SLOs met" if args.slo else "")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,228 @@
+"""
+Summary tables and SQL aggregates over stored analysis results
+
+Details.data keeps the full JSON for each analysis; file_metrics holds one
+flat row per analyzed file so totals, distributions and trends can be
+computed with GROUP BY instead of loading and normalizing every blob.
+
+Run `python metrics.py` once to backfill rows for analyses stored before
+the summary tables existed.
+"""
+import json
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import func, distinct
+from sqlalchemy.orm import Session
+
+from dynamic import Projects, Details, FileMetrics, FileDrivers
+
+BACKFILL_BATCH_SIZE = 200
+
+_TOTALS = (
+    func.count(FileMetrics.id).label("files"),
+    func.coalesce(func.sum(FileMetrics.lines), 0).label("lines"),
+    func.coalesce(func.sum(FileMetrics.functions), 0).label("functions"),
+    func.coalesce(func.sum(FileMetrics.classes), 0).label("classes"),
+    func.coalesce(func.sum(FileMetrics.variables), 0).label("variables"),
+    func.coalesce(func.sum(FileMetrics.imports), 0).label("imports"),
+    func.coalesce(func.sum(FileMetrics.loops), 0).label("loops"),
+)
+
+
+def _iter_files(data: Dict) -> Iterator[Tuple[str, str, Dict]]:
+    """Yield (role, file_name, stats) from a Details.data payload"""
+    main = data.get("results_main", {}) or {}
+    for i, file_name in enumerate(main.get("main_file", []), start=1):
+        yield "main", file_name, main.get("stats", {}).get(f"main_file{i}", {})
+    sub = data.get("results_sub", {}) or {}
+    for i, file_name in enumerate(sub.get("sub_files", []), start=1):
+        yield "sub", file_name, sub.get("stats", {}).get(f"subfile{i}", {})
+
+
+def file_metric_values(user_id: int, project_id: int, detail_id: Optional[int], data: Dict) -> List[Tuple[Dict, List[str]]]:
+    """Column values and distinct DB drivers for every file in an analysis payload"""
+    return [
+        ({
+            "user_id": user_id,
+            "project_id": project_id,
+            "detail_id": detail_id,
+            "file_name": file_name,
+            "role": role,
+            "lines": stats.get("lines", 0),
+            "functions": stats.get("functions", 0),
+            "classes": stats.get("classes", 0),
+            "variables": stats.get("variables", 0),
+            "imports": stats.get("imports", 0),
+            "loops": stats.get("FOR", 0),
+            "time_complexity": stats.get("time_complexity"),
+        }, sorted(set(stats.get("database", []))))
+        for role, file_name, stats in _iter_files(data)
+    ]
+
+
+def file_metric_rows(user_id: int, project_id: int, detail_id: Optional[int], data: Dict) -> List[FileMetrics]:
+    """Build summary rows for every file in an analysis payload"""
+    return [
+        FileMetrics(**values, drivers=[
+            FileDrivers(user_id=user_id, project_id=project_id, driver=driver)
+            for driver in drivers
+        ])
+        for values, drivers in file_metric_values(user_id, project_id, detail_id, data)
+    ]
+
+
+def store_file_metrics(db: Session, user_id: int, project_id: int, detail_id: Optional[int], data: Dict):
+    db.add_all(file_metric_rows(user_id, project_id, detail_id, data))
+    db.commit()
+
+
+def backfill_file_metrics(db: Session) -> int:
+    """Summarize the latest Details of every project that has no file_metrics rows yet"""
+    summarized = db.query(FileMetrics.project_id).distinct()
+    detail_ids = [
+        row[0] for row in
+        db.query(func.max(Details.id))
+        .filter(~Details.project_id.in_(summarized))
+        .group_by(Details.project_id)
+        .all()
+    ]
+
+    for start in range(0, len(detail_ids), BACKFILL_BATCH_SIZE):
+        batch = detail_ids[start:start + BACKFILL_BATCH_SIZE]
+        rows = (
+            db.query(Details.id, Details.data, Projects.id, Projects.user_id)
+            .join(Projects, Details.project_id == Projects.id)
+            .filter(Details.id.in_(batch))
+            .all()
+        )
+        for detail_id, data, project_id, user_id in rows:
+            if isinstance(data, str):
+                data = json.loads(data)
+            db.add_all(file_metric_rows(user_id, project_id, detail_id, data or {}))
+        db.commit()
+
+    return len(detail_ids)
+
+
+def _totals(row) -> Dict:
+    return {
+        "files": row.files,
+        "lines": int(row.lines),
+        "functions": int(row.functions),
+        "classes": int(row.classes),
+        "variables": int(row.variables),
+        "imports": int(row.imports),
+        "loops": int(row.loops),
+    }
+
+
+def _complexity_distribution(db: Session, *filters) -> Dict[str, int]:
+    rows = (
+        db.query(FileMetrics.time_complexity, func.count(FileMetrics.id))
+        .filter(*filters)
+        .group_by(FileMetrics.time_complexity)
+        .all()
+    )
+    return {complexity or "unknown": count for complexity, count in rows}
+
+
+def _driver_usage(db: Session, *filters) -> List[Dict]:
+    rows = (
+        db.query(
+            FileDrivers.driver,
+            func.count(FileDrivers.id),
+            func.count(distinct(FileDrivers.project_id))
+        )
+        .filter(*filters)
+        .group_by(FileDrivers.driver)
+        .order_by(func.count(FileDrivers.id).desc())
+        .all()
+    )
+    return [{"driver": driver, "files": files, "projects": projects} for driver, files, projects in rows]
+
+
+def user_summary(db: Session, user_id: int) -> Dict:
+    """Totals, distributions and per-project breakdown for a user"""
+    totals = db.query(*_TOTALS).filter(FileMetrics.user_id == user_id).one()
+    per_project = (
+        db.query(FileMetrics.project_id, Projects.project_name, *_TOTALS)
+        .join(Projects, FileMetrics.project_id == Projects.id)
+        .filter(FileMetrics.user_id == user_id)
+        .group_by(FileMetrics.project_id, Projects.project_name)
+        .order_by(FileMetrics.project_id.desc())
+        .all()
+    )
+    return {
+        "user_id": user_id,
+        "projects": len(per_project),
+        "totals": _totals(totals),
+        "time_complexity": _complexity_distribution(db, FileMetrics.user_id == user_id),
+        "database_drivers": _driver_usage(db, FileDrivers.user_id == user_id),
+        "per_project": [
+            dict(_totals(row), project_id=row.project_id, project_name=row.project_name)
+            for row in per_project
+        ],
+    }
+
+
+def project_summary(db: Session, user_id: int, project_id: int) -> Optional[Dict]:
+    """Totals and distributions for one project, or None if it has no metrics"""
+    filters = (FileMetrics.user_id == user_id, FileMetrics.project_id == project_id)
+    totals = db.query(*_TOTALS).filter(*filters).one()
+    if not totals.files:
+        return None
+    return {
+        "user_id": user_id,
+        "project_id": project_id,
+        "totals": _totals(totals),
+        "time_complexity": _complexity_distribution(db, *filters),
+        "database_drivers": _driver_usage(
+            db, FileDrivers.user_id == user_id, FileDrivers.project_id == project_id
+        ),
+    }
+
+
+def project_trends(db: Session, user_id: int, project_name: Optional[str] = None) -> Dict:
+    """
+    Totals for each version of a project over time
+    Every /analyze of the same project name is stored as a new version
+    """
+    query = (
+        db.query(
+            Projects.id.label("project_id"),
+            Projects.project_name,
+            func.min(FileMetrics.created_at).label("analyzed_at"),
+            *_TOTALS
+        )
+        .join(FileMetrics, FileMetrics.project_id == Projects.id)
+        .filter(Projects.user_id == user_id)
+    )
+    if project_name:
+        query = query.filter(Projects.project_name == project_name)
+    rows = (
+        query.group_by(Projects.id, Projects.project_name)
+        .order_by(Projects.project_name, Projects.id)
+        .all()
+    )
+
+    trends: Dict[str, List[Dict]] = {}
+    for row in rows:
+        versions = trends.setdefault(row.project_name, [])
+        versions.append(dict(
+            _totals(row),
+            version=len(versions) + 1,
+            project_id=row.project_id,
+            analyzed_at=row.analyzed_at.isoformat() if row.analyzed_at else None
+        ))
+    return {"user_id": user_id, "trends": trends}
+
+
+if __name__ == "__main__":
+    from database import SessionLocal, engine, Base
+
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        print(f"✓ Backfilled file metrics for {backfill_file_metrics(session)} projects")
+    finally:
+        session.close()
@@ -0,0 +1,66 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Hashable, Optional, Tuple
+
+
+class RenderedPageCache:
+    """
+    Small thread-safe LRU of rendered HTML, keyed by (user_id, etag)
+    The etag already encodes the data version, so stale entries are never
+    served; invalidate_user() just frees them early after a new analysis.
+    Bounded by entry count and by total characters of HTML held.
+    """
+
+    def __init__(self, max_entries: int = 256, max_chars: int = 32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_chars = max_chars
+        self._entries: "OrderedDict[Tuple[int, Hashable], str]" = OrderedDict()
+        self._chars = 0
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int, etag: str) -> Optional[str]:
+        with self._lock:
+            key = (user_id, etag)
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def set(self, user_id: int, etag: str, html: str):
+        if len(html) > self.max_chars:
+            return
+        with self._lock:
+            key = (user_id, etag)
+            if key in self._entries:
+                self._chars -= len(self._entries.pop(key))
+            self._entries[key] = html
+            self._chars += len(html)
+            while len(self._entries) > self.max_entries or self._chars > self.max_chars:
+                _, evicted = self._entries.popitem(last=False)
+                self._chars -= len(evicted)
+
+    def invalidate_user(self, user_id: int):
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == user_id]:
+                self._chars -= len(self._entries.pop(key))
+
+
+def make_etag(*parts) -> str:
+    """
+    Weak ETag from the values that identify a page version
+    Weak because the same version is served brotli, gzip or uncompressed
+    """
+    digest = hashlib.sha256(":".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+    return f'W/"{digest[:32]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Evaluate an If-None-Match header against an ETag (weak comparison)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return any(tag.removeprefix("W/") == opaque for tag in candidates)
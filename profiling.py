@@ -0,0 +1,241 @@
+"""
+Opt-in per-request profiling
+
+Enable with PROFILE_ENABLED=1. A request is then profiled when it carries
+an `X-Profile: 1` header, or at random with probability PROFILE_SAMPLE_RATE.
+Profiled requests record wall time, tracemalloc peaks and a cProfile for
+each named stage, and write <id>.json (summary) and <id>.prof (pstats) to
+PROFILE_DIR.
+
+tracemalloc is process-wide, so memory figures for requests profiled at the
+same time overlap; sample sparingly. cProfile records everything run on its
+thread, so a stage must not span an await: other requests' coroutines would
+run on the event loop meanwhile and be counted as this stage's CPU.
+"""
+import cProfile
+import json
+import os
+import pstats
+import random
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+PROFILE_ENABLED = os.getenv("PROFILE_ENABLED", "0") == "1"
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_HEADER = "x-profile"
+TOP_N = 15
+
+_current: ContextVar[Optional["RequestProfile"]] = ContextVar("request_profile", default=None)
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+_thread_state = threading.local()
+
+
+class RequestProfile:
+    def __init__(self, path: str):
+        self.id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.path = path
+        self.started = time.perf_counter()
+        self.peak_bytes = 0
+        self.stages: Dict[str, Dict] = {}
+        self.profilers: List[cProfile.Profile] = []
+        self.snapshot = None
+        self._high_water = 0
+        self._lock = threading.Lock()
+
+    def record_stage(self, name: str, seconds: float, peak_bytes: int, profiler: Optional[cProfile.Profile]):
+        current, peak = tracemalloc.get_traced_memory()
+        with self._lock:
+            stage = self.stages.setdefault(name, {"calls": 0, "seconds": 0.0, "peak_bytes": 0})
+            stage["calls"] += 1
+            stage["seconds"] += seconds
+            stage["peak_bytes"] = max(stage["peak_bytes"], peak_bytes)
+            self.peak_bytes = max(self.peak_bytes, peak)
+            if profiler is not None:
+                self.profilers.append(profiler)
+            # Snapshot while the stage's objects are still alive, at the live high-water mark
+            take_snapshot = current > self._high_water
+            if take_snapshot:
+                self._high_water = current
+        if take_snapshot:
+            snapshot = tracemalloc.take_snapshot()
+            with self._lock:
+                self.snapshot = snapshot
+
+    def summary(self) -> Dict:
+        stages = [
+            dict(stage, name=name, seconds=round(stage["seconds"], 6))
+            for name, stage in self.stages.items()
+        ]
+        stages.sort(key=lambda s: s["seconds"], reverse=True)
+
+        top_allocators = []
+        if self.snapshot is not None:
+            for stat in self.snapshot.statistics("lineno")[:TOP_N]:
+                frame = stat.traceback[0]
+                top_allocators.append({
+                    "location": f"{frame.filename}:{frame.lineno}",
+                    "size_bytes": stat.size,
+                    "count": stat.count,
+                })
+
+        hottest = []
+        if self.profilers:
+            stats = pstats.Stats(self.profilers[0])
+            for profiler in self.profilers[1:]:
+                stats.add(profiler)
+            rows = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)
+            for (filename, lineno, func), (cc, nc, tottime, cumtime, _) in rows[:TOP_N]:
+                hottest.append({
+                    "function": f"{filename}:{lineno}({func})",
+                    "calls": nc,
+                    "tottime": round(tottime, 6),
+                    "cumtime": round(cumtime, 6),
+                })
+
+        return {
+            "id": self.id,
+            "path": self.path,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "wall_seconds": round(time.perf_counter() - self.started, 6),
+            "peak_bytes": self.peak_bytes,
+            "stages": stages,
+            "top_allocators": top_allocators,
+            "hottest_functions": hottest,
+        }
+
+    def write(self):
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        summary = self.summary()
+        with open(os.path.join(PROFILE_DIR, f"{self.id}.json"), "w") as fh:
+            json.dump(summary, fh, indent=2)
+        if self.profilers:
+            stats = pstats.Stats(self.profilers[0])
+            for profiler in self.profilers[1:]:
+                stats.add(profiler)
+            stats.dump_stats(os.path.join(PROFILE_DIR, f"{self.id}.prof"))
+
+
+def should_profile(headers) -> bool:
+    if not PROFILE_ENABLED:
+        return False
+    if headers.get(PROFILE_HEADER, "") in ("1", "true"):
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+def active() -> bool:
+    return _current.get() is not None
+
+
+def _start_tracing():
+    global _tracing_users
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        _tracing_users += 1
+
+
+def _stop_tracing():
+    global _tracing_users
+    with _tracing_lock:
+        _tracing_users -= 1
+        if _tracing_users == 0:
+            tracemalloc.stop()
+
+
+@contextmanager
+def request_profile(headers, path: str):
+    """Profile the enclosed block if this request is selected; no-op otherwise"""
+    if not should_profile(headers):
+        yield None
+        return
+
+    _start_tracing()
+    tracemalloc.reset_peak()
+    profile = RequestProfile(path)
+    token = _current.set(profile)
+    try:
+        yield profile
+    finally:
+        _current.reset(token)
+        try:
+            profile.write()
+        except Exception as e:
+            print(f"Warning: Failed to write profile {profile.id}: {e}")
+        _stop_tracing()
+
+
+@contextmanager
+def stage(name: str):
+    """
+    Attribute time, memory and calls in the block to a named stage
+    Costs one ContextVar lookup when the request is not being profiled
+    """
+    profile = _current.get()
+    if profile is None:
+        yield
+        return
+
+    # Stages are meant to be flat; the guard keeps an accidental nested stage
+    # from replacing the outer stage's profiler on this thread
+    profiler = None
+    if not getattr(_thread_state, "profiling", False):
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+            _thread_state.profiling = True
+        except ValueError:
+            # Another profiler is already active in this interpreter
+            profiler = None
+
+    baseline = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1]
+        if profiler is not None:
+            profiler.disable()
+            _thread_state.profiling = False
+        profile.record_stage(name, seconds, max(0, peak - baseline), profiler)
+
+
+def list_profiles(limit: int = 50) -> List[Dict]:
+    """Newest-first summaries of written profiles"""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    names = sorted((n for n in os.listdir(PROFILE_DIR) if n.endswith(".json")), reverse=True)
+    profiles = []
+    for name in names[:limit]:
+        with open(os.path.join(PROFILE_DIR, name)) as fh:
+            summary = json.load(fh)
+        profiles.append({
+            "id": summary["id"],
+            "path": summary["path"],
+            "created_at": summary["created_at"],
+            "wall_seconds": summary["wall_seconds"],
+            "peak_bytes": summary["peak_bytes"],
+            "top_stage": summary["stages"][0]["name"] if summary["stages"] else None,
+            "top_allocator": summary["top_allocators"][0] if summary["top_allocators"] else None,
+            "hottest_function": summary["hottest_functions"][0] if summary["hottest_functions"] else None,
+        })
+    return profiles
+
+
+def load_profile(profile_id: str) -> Optional[Dict]:
+    if not all(c.isalnum() or c == "-" for c in profile_id):
+        return None
+    path = os.path.join(PROFILE_DIR, f"{profile_id}.json")
+    if not os.path.exists(path):
+        return None
+    with open(path) as fh:
+        return json.load(fh)
@@ -0,0 +1,197 @@
+import re
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from sqlalchemy import text, table, column, insert
+from sqlalchemy.orm import Session
+
+# Postgres keeps a generated tsvector column behind a GIN index; SQLite uses
+# an FTS5 virtual table. Both expose the same column names so inserts are shared.
+POSTGRES_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS function_search (
+        id BIGSERIAL PRIMARY KEY,
+        user_id INTEGER NOT NULL,
+        project_id INTEGER NOT NULL REFERENCES projects(id) ON DELETE CASCADE,
+        file_name TEXT NOT NULL,
+        function_name TEXT NOT NULL,
+        line_start INTEGER,
+        name_terms TEXT NOT NULL DEFAULT '',
+        file_terms TEXT NOT NULL DEFAULT '',
+        args TEXT NOT NULL DEFAULT '',
+        docstring TEXT NOT NULL DEFAULT '',
+        document tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('simple', name_terms), 'A') ||
+            setweight(to_tsvector('simple', file_terms || ' ' || args), 'B') ||
+            setweight(to_tsvector('simple', docstring), 'C')
+        ) STORED
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_function_search_document ON function_search USING GIN (document)",
+    "CREATE INDEX IF NOT EXISTS ix_function_search_user_project ON function_search (user_id, project_id)",
+]
+
+SQLITE_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS function_search USING fts5(
+        name_terms, file_terms, args, docstring,
+        function_name UNINDEXED, file_name UNINDEXED, line_start UNINDEXED,
+        user_id UNINDEXED, project_id UNINDEXED,
+        tokenize = 'unicode61'
+    )
+    """,
+]
+
+# The columns both variants share. Inserting through a Core construct (not
+# text()) lets SQLAlchemy batch executemany into multi-row INSERTs
+FUNCTION_SEARCH = table(
+    "function_search",
+    column("user_id"), column("project_id"), column("file_name"),
+    column("function_name"), column("line_start"),
+    column("name_terms"), column("file_terms"), column("args"), column("docstring"),
+)
+
+MAX_PAGE_SIZE = 100
+
+
+def _dialect(db: Session) -> str:
+    return db.get_bind().dialect.name
+
+
+def ensure_search_index(engine):
+    """Create the full-text index structures for the engine's dialect"""
+    if engine.dialect.name == "postgresql":
+        statements = POSTGRES_DDL
+    elif engine.dialect.name == "sqlite":
+        statements = SQLITE_DDL
+    else:
+        print(f"⚠ Full-text search not supported on {engine.dialect.name}")
+        return
+    with engine.begin() as conn:
+        for statement in statements:
+            conn.execute(text(statement))
+
+
+def split_identifier(name: str) -> List[str]:
+    """Split snake_case / camelCase / dotted names into lowercase words"""
+    words = []
+    for part in re.split(r"[^A-Za-z0-9]+", name):
+        words.extend(re.findall(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+", part))
+    return [w.lower() for w in words]
+
+
+def search_rows(user_id: int, project_id: int, functions: List[Dict]) -> List[Dict]:
+    """
+    Parameter rows for inserts into FUNCTION_SEARCH
+    Each function dict needs file_name, name, args, docstring and line_start;
+    qualname, when present, is stored as the function name (only name is tokenized)
+    """
+    return [
+        {
+            "user_id": user_id,
+            "project_id": project_id,
+            "file_name": fn["file_name"],
+            "function_name": fn.get("qualname", fn["name"]),
+            "line_start": fn.get("line_start"),
+            "name_terms": " ".join([fn["name"]] + split_identifier(fn["name"])),
+            "file_terms": " ".join(split_identifier(Path(fn["file_name"]).stem)),
+            "args": " ".join(fn.get("args", [])),
+            "docstring": fn.get("docstring", "") or "",
+        }
+        for fn in functions
+    ]
+
+
+def index_functions(db: Session, user_id: int, project_id: int, functions: List[Dict]):
+    """Add analyzed functions to the full-text index"""
+    if not functions:
+        return
+    db.execute(insert(FUNCTION_SEARCH), search_rows(user_id, project_id, functions))
+    db.commit()
+
+
+def build_query(query: str, dialect: str) -> Optional[str]:
+    """
+    Turn user input into a tsquery / FTS5 MATCH expression
+    All terms must match; a trailing '*' makes a term a prefix match
+    """
+    terms = []
+    for token in re.findall(r"[A-Za-z0-9_]+\*?", query):
+        prefix = token.endswith("*")
+        words = split_identifier(token.rstrip("*"))
+        for i, word in enumerate(words):
+            terms.append((word, prefix and i == len(words) - 1))
+    if not terms:
+        return None
+
+    if dialect == "postgresql":
+        return " & ".join(f"{w}:*" if prefix else w for w, prefix in terms)
+    return " AND ".join(f'"{w}"*' if prefix else f'"{w}"' for w, prefix in terms)
+
+
+def search_functions(
+    db: Session,
+    query: str,
+    user_id: Optional[int] = None,
+    project_id: Optional[int] = None,
+    page: int = 1,
+    page_size: int = 20
+) -> Dict:
+    """Ranked, paginated full-text search over indexed functions"""
+    dialect = _dialect(db)
+    page = max(page, 1)
+    page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+    match = build_query(query, dialect)
+    if not match:
+        return {"query": query, "page": page, "page_size": page_size, "results": [], "has_more": False}
+
+    filters = ""
+    params = {"match": match, "limit": page_size + 1, "offset": (page - 1) * page_size}
+    if user_id is not None:
+        filters += " AND user_id = :user_id"
+        params["user_id"] = user_id
+    if project_id is not None:
+        filters += " AND project_id = :project_id"
+        params["project_id"] = project_id
+
+    if dialect == "postgresql":
+        sql = f"""
+            SELECT function_name, file_name, project_id, user_id, line_start, args, docstring,
+                   ts_rank_cd(document, q) AS rank
+            FROM function_search, to_tsquery('simple', :match) AS q
+            WHERE document @@ q{filters}
+            ORDER BY rank DESC, id
+            LIMIT :limit OFFSET :offset
+        """
+    else:
+        # bm25 weights follow the Postgres A/B/C column weights
+        sql = f"""
+            SELECT function_name, file_name, project_id, user_id, line_start, args, docstring,
+                   -bm25(function_search, 10.0, 4.0, 4.0, 1.0) AS rank
+            FROM function_search
+            WHERE function_search MATCH :match{filters}
+            ORDER BY rank DESC, rowid
+            LIMIT :limit OFFSET :offset
+        """
+
+    rows = db.execute(text(sql), params).mappings().all()
+    results = [
+        {
+            "function_name": row["function_name"],
+            "file_name": row["file_name"],
+            "project_id": int(row["project_id"]),
+            "user_id": int(row["user_id"]),
+            "line_start": row["line_start"],
+            "args": row["args"].split() if row["args"] else [],
+            "docstring": (row["docstring"] or "")[:200],
+            "rank": round(float(row["rank"]), 4),
+        }
+        for row in rows[:page_size]
+    ]
+    return {
+        "query": query,
+        "page": page,
+        "page_size": page_size,
+        "results": results,
+        "has_more": len(rows) > page_size,
+    }
@@ -0,0 +1,54 @@
+import os
+import sys
+import tempfile
+import uuid
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Every test session gets its own SQLite database and upload directory
+WORKDIR = tempfile.mkdtemp(prefix="jenkins_project_tests_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(WORKDIR, 'test.sqlite')}"
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+
+    # uploads/ is relative to the working directory
+    previous = os.getcwd()
+    os.chdir(WORKDIR)
+    try:
+        import demo
+        with TestClient(demo.app) as test_client:
+            yield test_client
+    finally:
+        os.chdir(previous)
+
+
+@pytest.fixture
+def user_id(client):
+    from database import SessionLocal
+    from dynamic import Authenticate
+
+    db = SessionLocal()
+    try:
+        user = Authenticate(name=f"user-{uuid.uuid4().hex[:8]}", password="unused")
+        db.add(user)
+        db.commit()
+        return user.id
+    finally:
+        db.close()
+
+
+def analyze(client, user_id, project_name, files):
+    """POST /analyze with {file name: source} and return the response"""
+    response = client.post(
+        "/analyze",
+        files=[("files", (name, code.encode("utf-8"))) for name, code in files.items()],
+        data={"project_name": project_name, "user_id": user_id}
+    )
+    assert response.status_code == 200
+    return response
@@ -0,0 +1,87 @@
+import ast
+
+from analysis import analyze_tree, extract_functions_from_code
+
+SOURCE = '''
+import os
+
+class Walker:
+    def walk(self, node):
+        if node.left:
+            self.walk(node.left)
+        elif node.right:
+            self.walk(node.right)
+        else:
+            return None
+
+    def evens(self, xs):
+        return [x for x in xs if x % 2 if x > 0]
+
+def grid_total(rows):
+    total = 0
+    for row in rows:
+        for cell in row:
+            if cell and total:
+                total += cell
+    return total
+
+def outer():
+    def inner():
+        return 1
+    return inner
+'''
+
+
+def functions_by_qualname():
+    return {func["qualname"]: func for func in extract_functions_from_code(SOURCE, "<test>")}
+
+
+def test_qualnames_include_classes_and_enclosing_functions():
+    assert set(functions_by_qualname()) == {
+        "Walker.walk", "Walker.evens", "grid_total", "outer", "outer.<locals>.inner"
+    }
+
+
+def test_elif_does_not_add_nesting():
+    walk = functions_by_qualname()["Walker.walk"]
+    assert walk["cyclomatic"] == 3
+    assert walk["max_nesting"] == 1
+
+
+def test_self_method_call_counts_as_recursion():
+    functions = functions_by_qualname()
+    assert functions["Walker.walk"]["recursive"] is True
+    assert functions["Walker.evens"]["recursive"] is False
+
+
+def test_comprehension_and_its_ifs_are_decision_points():
+    evens = functions_by_qualname()["Walker.evens"]
+    assert evens["cyclomatic"] == 4
+    assert evens["max_nesting"] == 0
+
+
+def test_loops_nesting_and_boolean_operators():
+    grid_total = functions_by_qualname()["grid_total"]
+    assert grid_total["cyclomatic"] == 5
+    assert grid_total["max_nesting"] == 3
+    assert grid_total["loops"] == 2
+    assert grid_total["loc"] == 7
+
+
+def test_file_level_counts():
+    visitor = analyze_tree(ast.parse(SOURCE), SOURCE)
+    assert visitor.counts == {"classes": 1, "FOR": 2, "imports": 1, "variables": 1}
+    assert visitor.max_loop_depth == 2
+
+
+def test_decorators_defaults_and_annotations_count_in_enclosing_scope():
+    source = (
+        "def make():\n"
+        "    @wrap(a or b)\n"
+        "    def inner(x: A if c else B = d and e, *rest: F or G) -> H or I:\n"
+        "        return x\n"
+        "    return inner\n"
+    )
+    functions = {f["qualname"]: f for f in extract_functions_from_code(source, "<test>")}
+    assert functions["make"]["cyclomatic"] == 6
+    assert functions["make.<locals>.inner"]["cyclomatic"] == 1
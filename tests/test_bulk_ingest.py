@@ -0,0 +1,138 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import bulk_ingest
+import demo
+from bulk_ingest import ingest
+from database import SessionLocal
+from dynamic import Projects, Details, FileMetrics, FunctionFingerprints
+
+MAIN = b"def run(xs):\n    for x in xs:\n        print(x)\n\nif __name__ == '__main__':\n    run([1])\n"
+UTIL = b"def helper(a, b):\n    \"\"\"Add things\"\"\"\n    return a + b\n"
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def project_specs(tmp_path, names):
+    specs = []
+    for name in names:
+        folder = tmp_path / name
+        folder.mkdir()
+        (folder / "util.py").write_bytes(UTIL)
+        specs.append({"project_name": name, "paths": [str(folder / "util.py")], "upload_errors": []})
+    return specs
+
+
+def saved_names(db, user_id):
+    return sorted(name for (name,) in db.query(Projects.project_name).filter(Projects.user_id == user_id))
+
+
+def fail_writes_for(monkeypatch, project_name):
+    original = bulk_ingest.file_metric_values
+
+    def file_metric_values(user_id, project_id, detail_id, data):
+        if data["project_name"] == project_name:
+            raise RuntimeError(f"cannot write {project_name}")
+        return original(user_id, project_id, detail_id, data)
+
+    monkeypatch.setattr(bulk_ingest, "file_metric_values", file_metric_values)
+
+
+def test_failed_write_is_retried_alone_and_reported(tmp_path, db, user_id, monkeypatch):
+    fail_writes_for(monkeypatch, "bad")
+
+    report = ingest(db, project_specs(tmp_path, ["ok1", "bad", "ok2"]), user_id, batch_size=3, workers=1)
+
+    assert report["saved"] == 2 and report["failed"] == 1
+    ok1, bad, ok2 = report["projects"]
+    assert ok1["status"] == "saved" and ok2["status"] == "saved"
+    assert bad == {"project_name": "bad", "files": 1, "status": "failed",
+                   "stage": "write", "error": "cannot write bad"}
+    assert saved_names(db, user_id) == ["ok1", "ok2"]
+
+    # Nothing from the failed project's rolled-back attempts is left behind
+    project_ids = [ok1["project_id"], ok2["project_id"]]
+    assert db.query(Details).filter(Details.project_id.in_(project_ids)).count() == 2
+    assert db.query(FileMetrics).filter(FileMetrics.user_id == user_id).count() == 2
+    assert db.query(FunctionFingerprints).filter(FunctionFingerprints.user_id == user_id).count() == 2
+
+
+def test_committed_batches_survive_a_later_failure(tmp_path, db, user_id, monkeypatch):
+    fail_writes_for(monkeypatch, "bad")
+
+    report = ingest(db, project_specs(tmp_path, ["ok1", "ok2", "bad"]), user_id, batch_size=2, workers=1)
+
+    assert [p["status"] for p in report["projects"]] == ["saved", "saved", "failed"]
+    assert saved_names(db, user_id) == ["ok1", "ok2"]
+
+
+def test_analysis_failure_is_reported(tmp_path, db, user_id, monkeypatch):
+    original = bulk_ingest.analyze_project
+
+    def analyze_project(project_name, *args):
+        if project_name == "broken":
+            raise ValueError("analyzer crashed")
+        return original(project_name, *args)
+
+    monkeypatch.setattr(bulk_ingest, "analyze_project", analyze_project)
+
+    report = ingest(db, project_specs(tmp_path, ["broken", "fine"]), user_id, workers=1)
+
+    broken, fine = report["projects"]
+    assert (broken["status"], broken["stage"], broken["error"]) == ("failed", "analysis", "analyzer crashed")
+    assert fine["status"] == "saved"
+
+
+def test_batch_size_is_validated(db, user_id):
+    with pytest.raises(ValueError):
+        ingest(db, [], user_id, batch_size=0)
+
+
+def test_endpoint_groups_files_by_project(client, user_id, db, monkeypatch):
+    pool = ThreadPoolExecutor(max_workers=2)
+    monkeypatch.setattr(demo, "shared_pool", lambda: pool)
+
+    response = client.post(
+        "/bulk/analyze",
+        files=[("files", ("main.py", MAIN)), ("files", ("util.py", UTIL)),
+               ("files", ("util.py", UTIL)), ("files", ("c.txt", b"hi"))],
+        data={"projects": ["app", "app", "lib", "notes"], "user_id": user_id, "batch_size": 2}
+    )
+    pool.shutdown()
+
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["saved"], body["failed"]) == (2, 1)
+    app, lib, notes = body["projects"]
+    assert (app["project_name"], app["files"], app["status"]) == ("app", 2, "saved")
+    assert (lib["project_name"], lib["files"], lib["status"]) == ("lib", 1, "saved")
+    assert notes == {"project_name": "notes", "files": 0, "status": "failed", "stage": "upload",
+                     "error": "No files uploaded", "upload_errors": ["c.txt: Only .py files"]}
+
+    data = db.query(Details.data).filter(Details.project_id == app["project_id"]).scalar()
+    assert sorted(data["files_list"]["file_list"]) == ["main.py", "util.py"]
+    assert data["project_id"] == app["project_id"]
+
+
+@pytest.mark.parametrize("data, status", [
+    ({"projects": ["a", "b"]}, 400),
+    ({"projects": ["a"], "batch_size": 0}, 400),
+    ({"projects": ["a"], "batch_size": 1001}, 400),
+    ({"projects": ["  "]}, 400),
+    ({"projects": ["a"], "user_id": 999999}, 404),
+])
+def test_endpoint_validation(client, user_id, data, status):
+    response = client.post(
+        "/bulk/analyze",
+        files=[("files", ("util.py", UTIL))],
+        data=dict({"user_id": user_id}, **data)
+    )
+    assert response.status_code == status
@@ -0,0 +1,72 @@
+import hashlib
+
+SOURCE = b"def add(a, b):\n    return a + b\n\nif __name__ == '__main__':\n    print(add(1, 2))\n"
+CHUNK_SIZE = 32
+
+
+def start_session(client, user_id):
+    response = client.post("/uploads", data={
+        "filenames": "calc.py", "sizes": len(SOURCE), "project_name": "calc",
+        "user_id": user_id, "chunk_size": CHUNK_SIZE
+    })
+    assert response.status_code == 200
+    return response.json()["session_id"]
+
+
+def put_chunk(client, session_id, index, body, **kwargs):
+    return client.put(
+        f"/uploads/{session_id}/files/0/chunks/{index}",
+        headers={"X-Chunk-SHA256": hashlib.sha256(body).hexdigest()},
+        content=body, **kwargs
+    )
+
+
+def chunks():
+    return [SOURCE[i:i + CHUNK_SIZE] for i in range(0, len(SOURCE), CHUNK_SIZE)]
+
+
+def test_resume_and_finalize(client, user_id):
+    session_id = start_session(client, user_id)
+    first, *rest = chunks()
+
+    assert put_chunk(client, session_id, 0, first).json()["already_received"] is False
+    assert put_chunk(client, session_id, 0, first).json()["already_received"] is True
+    assert client.post(f"/uploads/{session_id}/finalize").status_code == 409
+
+    status = client.get(f"/uploads/{session_id}").json()
+    assert status["files"][0]["missing"] == list(range(1, len(rest) + 1))
+    for index, body in enumerate(rest, start=1):
+        assert put_chunk(client, session_id, index, body).status_code == 200
+
+    response = client.post(f"/uploads/{session_id}/finalize")
+    assert response.status_code == 200
+    assert client.get(f"/uploads/{session_id}").status_code == 404
+
+
+def test_oversized_chunk_rejected_by_content_length(client, user_id):
+    session_id = start_session(client, user_id)
+
+    response = put_chunk(client, session_id, 0, b"x" * (CHUNK_SIZE + 1))
+
+    assert response.status_code == 413
+    assert client.get(f"/uploads/{session_id}").json()["files"][0]["received"] == []
+
+
+def test_oversized_chunk_rejected_without_content_length(client, user_id):
+    session_id = start_session(client, user_id)
+    body = b"x" * (CHUNK_SIZE * 4)
+
+    # A generator body is sent with chunked transfer encoding, no Content-Length
+    response = client.put(
+        f"/uploads/{session_id}/files/0/chunks/0",
+        headers={"X-Chunk-SHA256": hashlib.sha256(body).hexdigest()},
+        content=(body[i:i + 8] for i in range(0, len(body), 8))
+    )
+
+    assert response.status_code == 413
+
+
+def test_unknown_chunk_index_is_404(client, user_id):
+    session_id = start_session(client, user_id)
+
+    assert put_chunk(client, session_id, 99, b"x").status_code == 404
@@ -0,0 +1,62 @@
+import demo
+from conftest import analyze
+
+PRICING = '''
+def total_price(items, tax):
+    total = 0
+    for item in items:
+        if item.price > 0:
+            total += item.price * item.quantity
+    return total * (1 + tax)
+'''
+
+ORDERS = '''
+def order_total(lines, rate):
+    total = 0
+    for line in lines:
+        if line.price > 0:
+            total += line.price * line.quantity
+    return round(total * (1 + rate), 2)
+'''
+
+# 130 identical functions share every LSH bucket: 8385 same-hash pairs
+GETTERS = "\n".join("def g(x): return x" for _ in range(130))
+
+
+def near_pairs(body):
+    return {
+        tuple(sorted((pair["a"]["function_name"], pair["b"]["function_name"])))
+        for pair in body["near_duplicates"]
+    }
+
+
+def test_near_duplicates_found(client, user_id):
+    analyze(client, user_id, "shop", {"pricing.py": PRICING, "orders.py": ORDERS})
+
+    body = client.get(f"/duplicates/{user_id}", params={"threshold": 0.6}).json()
+
+    assert near_pairs(body) == {("order_total", "total_price")}
+    assert body["exact_duplicates"] == []
+    assert body["candidates_truncated"] is False
+
+
+def test_exact_duplicates_do_not_crowd_out_near_duplicates(client, user_id):
+    analyze(client, user_id, "shop", {"pricing.py": PRICING, "orders.py": ORDERS})
+    analyze(client, user_id, "getters", {"getters.py": GETTERS})
+
+    body = client.get(f"/duplicates/{user_id}", params={"threshold": 0.6}).json()
+
+    assert near_pairs(body) == {("order_total", "total_price")}
+    assert body["candidates_truncated"] is False
+    assert len(body["exact_duplicates"]) == 1
+    assert len(body["exact_duplicates"][0]["functions"]) == 130
+
+
+def test_candidate_truncation_is_reported(client, user_id, monkeypatch):
+    analyze(client, user_id, "shop", {"pricing.py": PRICING, "orders.py": ORDERS})
+    monkeypatch.setattr(demo, "MAX_DUPLICATE_CANDIDATES", 0)
+
+    body = client.get(f"/duplicates/{user_id}", params={"threshold": 0.6}).json()
+
+    assert body["candidates_truncated"] is True
+    assert body["near_duplicates"] == []
@@ -0,0 +1,93 @@
+import demo
+from conftest import analyze
+from page_cache import RenderedPageCache, make_etag, etag_matches
+
+SOURCE = "def add(a, b):\n    return a + b\n"
+
+
+def test_make_etag_is_weak_and_stable():
+    etag = make_etag("final", 1, 2, 3)
+    assert etag.startswith('W/"') and etag.endswith('"')
+    assert etag == make_etag("final", 1, 2, 3)
+    assert etag != make_etag("final", 1, 2, 4)
+
+
+def test_etag_matches_weak_comparison_and_lists():
+    etag = make_etag("page")
+    strong = etag.removeprefix("W/")
+    assert etag_matches(etag, etag)
+    assert etag_matches(strong, etag)
+    assert etag_matches(f'"other", {strong}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"other"', etag)
+    assert not etag_matches(None, etag)
+    assert not etag_matches("", etag)
+
+
+def test_cache_evicts_least_recently_used_by_size():
+    cache = RenderedPageCache(max_entries=10, max_chars=10)
+    cache.set(1, "a", "a" * 4)
+    cache.set(1, "b", "b" * 4)
+    cache.get(1, "a")
+    cache.set(1, "c", "c" * 4)
+
+    assert cache.get(1, "b") is None
+    assert cache.get(1, "a") == "a" * 4
+    assert cache.get(1, "c") == "c" * 4
+
+
+def test_cache_evicts_by_entry_count():
+    cache = RenderedPageCache(max_entries=2, max_chars=1000)
+    for key in "abc":
+        cache.set(1, key, key)
+    assert cache.get(1, "a") is None
+    assert cache.get(1, "c") == "c"
+
+
+def test_cache_skips_pages_larger_than_the_budget():
+    cache = RenderedPageCache(max_entries=10, max_chars=10)
+    cache.set(1, "small", "s" * 5)
+    cache.set(1, "huge", "h" * 11)
+
+    assert cache.get(1, "huge") is None
+    assert cache.get(1, "small") == "s" * 5
+
+
+def test_replacing_an_entry_does_not_leak_size():
+    cache = RenderedPageCache(max_entries=10, max_chars=10)
+    for _ in range(5):
+        cache.set(1, "a", "a" * 8)
+    cache.set(1, "b", "b" * 2)
+    assert cache.get(1, "a") == "a" * 8
+    assert cache.get(1, "b") == "b" * 2
+
+
+def test_invalidate_user_only_drops_that_user():
+    cache = RenderedPageCache()
+    cache.set(1, "a", "one")
+    cache.set(2, "a", "two")
+    cache.invalidate_user(1)
+    assert cache.get(1, "a") is None
+    assert cache.get(2, "a") == "two"
+
+
+def test_final_page_revalidation(client, user_id):
+    analyze(client, user_id, "first", {"calc.py": SOURCE})
+
+    response = client.get(f"/final/{user_id}")
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+    assert etag.startswith("W/")
+    assert "accept-encoding" in response.headers["vary"].lower()
+    assert demo.rendered_pages.get(user_id, etag) is not None
+
+    not_modified = client.get(f"/final/{user_id}", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.headers["etag"] == etag
+
+    # A new analysis changes the version and drops the user's cached pages
+    analyze(client, user_id, "second", {"calc.py": SOURCE})
+    assert demo.rendered_pages.get(user_id, etag) is None
+    stale = client.get(f"/final/{user_id}", headers={"If-None-Match": etag})
+    assert stale.status_code == 200
+    assert stale.headers["etag"] != etag
@@ -0,0 +1,83 @@
+import pytest
+
+from conftest import analyze
+from search import build_query, split_identifier
+
+SOURCE = '''
+def calculateTotal(items):
+    """Sum the prices of every item"""
+    return sum(items)
+
+def calc_tax(amount, rate):
+    return amount * rate
+
+class Invoice:
+    def render_html(self):
+        return ""
+'''
+
+
+def search(client, q, **params):
+    response = client.get("/search", params=dict(params, q=q))
+    assert response.status_code == 200
+    return response.json()
+
+
+def names(body):
+    return sorted(r["function_name"] for r in body["results"])
+
+
+def test_split_identifier_handles_camel_snake_and_acronyms():
+    assert split_identifier("calculateTotal") == ["calculate", "total"]
+    assert split_identifier("calc_tax") == ["calc", "tax"]
+    assert split_identifier("HTTPServer.parseURL2") == ["http", "server", "parse", "url", "2"]
+
+
+def test_build_query_splits_identifiers_and_keeps_prefix_on_last_word():
+    assert build_query("calculateTotal", "sqlite") == '"calculate" AND "total"'
+    assert build_query("calc_ta*", "sqlite") == '"calc" AND "ta"*'
+    assert build_query("calc_ta*", "postgresql") == "calc & ta:*"
+    assert build_query("  ***  ", "sqlite") is None
+
+
+def test_prefix_and_identifier_words_match(client, user_id):
+    analyze(client, user_id, "billing", {"billing.py": SOURCE})
+
+    assert names(search(client, "calc*", user_id=user_id)) == ["calc_tax", "calculateTotal"]
+    assert names(search(client, "calc", user_id=user_id)) == ["calc_tax"]
+    assert names(search(client, "total", user_id=user_id)) == ["calculateTotal"]
+    assert names(search(client, "renderHtml", user_id=user_id)) == ["Invoice.render_html"]
+    assert names(search(client, "prices", user_id=user_id)) == ["calculateTotal"]
+
+
+def test_filters_by_user_and_project(client, user_id):
+    analyze(client, user_id, "first", {"first.py": "def shared_helper():\n    pass\n"})
+    analyze(client, user_id, "second", {"second.py": "def shared_helper():\n    pass\n"})
+
+    everything = search(client, "shared_helper", user_id=user_id)
+    project_ids = {r["project_id"] for r in everything["results"]}
+    assert len(project_ids) == 2
+    assert {r["user_id"] for r in everything["results"]} == {user_id}
+
+    project_id = min(project_ids)
+    only_first = search(client, "shared_helper", user_id=user_id, project_id=project_id)
+    assert [r["project_id"] for r in only_first["results"]] == [project_id]
+
+    assert search(client, "shared_helper", user_id=user_id + 1000)["results"] == []
+
+
+def test_pagination_reports_has_more(client, user_id):
+    source = "".join(f"def paged_fn_{i}():\n    pass\n" for i in range(5))
+    analyze(client, user_id, "paged", {"paged.py": source})
+
+    pages = [search(client, "paged*", user_id=user_id, page=page, page_size=2) for page in (1, 2, 3)]
+    assert [len(p["results"]) for p in pages] == [2, 2, 1]
+    assert [p["has_more"] for p in pages] == [True, True, False]
+    seen = [r["function_name"] for p in pages for r in p["results"]]
+    assert sorted(seen) == [f"paged_fn_{i}" for i in range(5)]
+
+
+@pytest.mark.parametrize("q", ["", "   "])
+def test_empty_query_is_rejected(client, q):
+    response = client.get("/search", params={"q": q})
+    assert response.status_code == 400